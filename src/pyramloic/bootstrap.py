@@ -17,3 +17,17 @@ mimetypes.add_type("application/json", ".json")
 yaml.add_representer(ParserRamlInclude, ParserRamlInclude.representer)
 yaml.add_constructor(ParserRamlInclude.yaml_tag, ParserRamlInclude.loader)
 
+# Loader used for RAML files: the libyaml (C) loader when PyYaml is build with it, the pure python loader otherwise
+try:
+    from yaml import CSafeLoader as _RamlBaseLoader
+    YAML_BACKEND = "libyaml"
+except ImportError:
+    from yaml import SafeLoader as _RamlBaseLoader
+    YAML_BACKEND = "python"
+
+
+class RamlLoader(_RamlBaseLoader):
+    pass
+
+RamlLoader.add_constructor(ParserRamlInclude.yaml_tag, ParserRamlInclude.loader)
+
@@ -0,0 +1,225 @@
+__author__ = 'ad'
+
+import os
+import errno
+import hashlib
+import tempfile
+import threading
+import cPickle as pickle
+
+# bump when the pickled tree layout changes, old cache entries are then ignored
+PARSE_CACHE_FORMAT = 1
+PARSE_CACHE_EXTENSION = ".ramltree"
+DEFAULT_PARSE_CACHE_SIZE = 64 * 1024 * 1024
+
+
+class IncludeCache(object):
+    """
+    Process wide cache of loaded RAML includes
+
+    Entries are keyed by absolute path (or URL) and stored together with a stamp
+    describing the source at load time, e.g. (mtime, size) of a local file.
+    An entry is only handed out when the stamp still matches, so includes that
+    change on disk are loaded again.
+
+    >>> cache = IncludeCache()
+    >>> cache.lookup("/tmp/a.raml", (1, 2))
+    (False, None)
+    >>> cache.store("/tmp/a.raml", (1, 2), "content")
+    >>> cache.lookup("/tmp/a.raml", (1, 2))
+    (True, 'content')
+    >>> cache.lookup("/tmp/a.raml", (3, 2))
+    (False, None)
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key, stamp):
+        """
+        Find the cached value of `key`
+
+        :param key: absolute path or URL of the include
+        :type key: str
+        :param stamp: stamp of the current source, None if the source can't be checked
+        :type stamp: tuple or None
+
+        :return: 2 elements tuple: found flag and cached value
+        :rtype: bool,object
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, None
+
+    def store(self, key, stamp, value):
+        """
+        Store `value` for `key`, replacing any older entry
+
+        :param key: absolute path or URL of the include
+        :type key: str
+        :param stamp: stamp of the source the value was loaded from
+        :type stamp: tuple or None
+        :param value: value to cache
+        :type value: object
+        """
+        with self._lock:
+            self._entries[key] = (stamp, value)
+
+    def clear(self):
+        """
+        Drop all entries and reset the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Counters of the cache
+
+        :return: dict with number of entries, hits and misses
+        :rtype: dict
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ParseCache(object):
+    """
+    Persistent on disk cache of parsed RAML trees
+
+    Trees are pickled into `cache_dir`, one file per key. The key is computed by
+    the caller from the contents of the RAML file and all its includes
+    (see pyramloic.parser.load). The total size of the cache directory is kept
+    below `max_size` bytes by removing the least recently used entries.
+    """
+
+    def __init__(self, cache_dir, max_size=DEFAULT_PARSE_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        try:
+            os.makedirs(cache_dir)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    @staticmethod
+    def make_key(parts):
+        """
+        Compute a cache key
+
+        :param parts: strings describing the input, e.g. file names and file contents
+        :type parts: list of str
+
+        :return: hex digest
+        :rtype: str
+        """
+        digest = hashlib.sha1(str(PARSE_CACHE_FORMAT))
+        for part in parts:
+            # length prefix, so that the boundaries between parts are part of the key
+            digest.update("%d:" % len(part))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + PARSE_CACHE_EXTENSION)
+
+    def load(self, key):
+        """
+        Load the tree stored under `key`
+
+        :return: the tree or None if there is no (usable) entry
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                tree = pickle.load(f)
+        except IOError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            # broken entry, e.g. written by an other version of the model classes
+            print "ParseCache: removing unusable entry:", path, e
+            self._remove(path)
+            self.misses += 1
+            return None
+        # mark as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return tree
+
+    def store(self, key, tree):
+        """
+        Store `tree` under `key` and evict old entries when the cache became too big
+        """
+        path = self._path(key)
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(tree, f, pickle.HIGHEST_PROTOCOL)
+            # rename over an existing file is not allowed on windows
+            self._remove(path)
+            os.rename(temp_path, path)
+        except Exception as e:
+            print "ParseCache: could not store:", path, e
+            self._remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_size
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(PARSE_CACHE_EXTENSION):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+            self.evictions += 1
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        """
+        Counters of the cache
+
+        :return: dict with number of hits, misses and evictions
+        :rtype: dict
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -1,5 +1,6 @@
 __author__ = 'ad'
 
+import threading
 import contextlib
 import urllib2
 import mimetypes
@@ -13,7 +14,8 @@ from raml_elements import ParserRamlInclude
 from fields import String, Reference
 from entities import RamlRoot, RamlResource, RamlMethod, RamlBody, RamlResourceType, RamlTrait, RamlQueryParameter
 from constants import RAML_SUPPORTED_FORMAT_VERSION
-import bootstrap
+from cache import IncludeCache
+from bootstrap import RamlLoader, YAML_BACKEND
 
 
 class RamlException(StandardError):
@@ -28,6 +30,10 @@ class RamlParseException(RamlException):
     pass
 
 
+# process wide cache of loaded includes, shared by all parse contexts
+include_cache = IncludeCache()
+
+
 class ParseContext(object):
     def __init__(self, data, relative_path):
         self.data = data
@@ -53,7 +59,7 @@ class ParseContext(object):
             _property_value, file_type = self._load_include(property_value.file_name)
             if _is_mime_type_raml(file_type):
                 relative_path = _calculate_new_relative_path(self.relative_path, property_value.file_name)
-                property_value = ParseContext(yaml.load(_property_value), relative_path)
+                property_value = ParseContext(_property_value, relative_path)
             else:
                 property_value = _property_value
         return property_value
@@ -73,19 +79,35 @@ class ParseContext(object):
     def _load_include(self, file_name):
         """
         Load RAML include from file_name.
+        The result is taken from the include cache when the file did not change since it was loaded.
+
         :param file_name: name of file to include
         :type file_name: str
 
-        :return: 2 elements tuple: file content and file type
-        :rtype: str,str
+        :return: 2 elements tuple: file content (parsed content for RAML/YAML files) and file type
+        :rtype: object,str
         """
 
         if not _is_network_resource(self.relative_path):
-            full_path = os.path.join(self.relative_path, file_name)
-            return _load_local_file(full_path)
+            key = str(Path(os.path.join(self.relative_path, file_name)).absolute())
+            stamp = _local_file_stamp(key)
+            loader = _load_local_file
         else:
-            url = urlparse.urljoin(self.relative_path, file_name)
-            return _load_network_resource(url)
+            # network resources can't be checked for changes, they are cached for the lifetime of the process
+            key = urlparse.urljoin(self.relative_path, file_name)
+            stamp = None
+            loader = _load_network_resource
+
+        found, value = include_cache.lookup(key, stamp)
+        if found:
+            return value
+
+        content, file_type = loader(key)
+        if _is_mime_type_raml(file_type):
+            content = load_yaml(content)
+        value = (content, file_type)
+        include_cache.store(key, stamp, value)
+        return value
 
 # Adding this to add !include support in yaml parser
 def yaml_include(loader, node):
@@ -94,37 +116,141 @@ def yaml_include(loader, node):
 
     try:
         with file(file_name) as inputfile:
-            return yaml.load(inputfile)
+            return load_yaml(inputfile)
     except:
         print "ERROR could not open file:", file_name
         pass
             
-def load(uri):
+def load_yaml(c):
+    """
+    Load YAML content with the RAML loader (libyaml based when available, see YAML_BACKEND)
+
+    :param c: content
+    :type c: str or file
+
+    :return: python representation of the content
+    """
+    return yaml.load(c, Loader=RamlLoader)
+
+
+def load(uri, cache=None, lazy=False):
     """
     Load and parse RAML file
 
     :param uri:
     :type uri: str
 
+    :param cache: optional on disk cache of parsed trees, only used for local files
+    :type cache: pyramloic.cache.ParseCache
+
+    :param lazy: parse resources on first use, see LazyRamlResource.
+                 ignored when a cache is used: only complete trees are cached.
+    :type lazy: bool
+
     :return:
     """
 
     if _is_network_resource(uri):
         relative_path = _build_network_relative_path(uri)
         c, _ = _load_network_resource(uri)
-    else:
-        relative_path = os.path.dirname(uri)
-        c, _ = _load_local_file(uri)
+        return parse(c, relative_path, lazy=lazy)
+
+    relative_path = os.path.dirname(uri)
+    c, _ = _load_local_file(uri)
 
-    return parse(c, relative_path)
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(_collect_include_contents(c, relative_path))
+        root = cache.load(cache_key)
+        if root is not None:
+            return root
 
+    root = parse(c, relative_path, lazy=lazy and cache is None)
 
-def parse(c, relative_path):
+    if cache_key is not None:
+        cache.store(cache_key, root)
+    return root
+
+
+class _IncludeCollector(RamlLoader):
+    """
+    RAML loader that records the file names of the !include tags it constructs
+    """
+    def __init__(self, stream):
+        RamlLoader.__init__(self, stream)
+        self.includes = []
+
+    def construct_include(self, node):
+        include = ParserRamlInclude.loader(self, node)
+        self.includes.append(include.file_name)
+        return include
+
+_IncludeCollector.add_constructor(ParserRamlInclude.yaml_tag, _IncludeCollector.construct_include)
+
+
+def _find_includes(c):
+    """
+    Find the files included by the content.
+    Only real !include tags are found: not the ones in comments or strings, names may contain spaces.
+
+    :param c: file content
+    :type c: str
+
+    :return: file names in document order
+    :rtype: list of str
+    """
+    loader = _IncludeCollector(c)
+    try:
+        loader.get_single_data()
+    finally:
+        loader.dispose()
+    return loader.includes
+
+
+def _collect_include_contents(c, relative_path, seen=None):
+    """
+    Collect the content of a RAML file and all files it includes (transitively).
+    Includes are found by loading the YAML, the RAML tree itself is not built.
+
+    :param c: file content
+    :type c: str
+    :param relative_path: directory the includes are relative to
+    :type relative_path: str
+
+    :return: list of strings: the content followed by name and content of each include
+    :rtype: list of str
+    """
+    if seen is None:
+        seen = set()
+    parts = [c]
+    for file_name in _find_includes(c):
+        # the key is computed over byte strings
+        file_name = file_name.encode("utf-8")
+        full_path = os.path.normpath(os.path.join(relative_path, file_name))
+        if full_path in seen:
+            continue
+        seen.add(full_path)
+        parts.append(file_name)
+        try:
+            content, file_type = _load_local_file(full_path)
+        except RamlNotFoundException:
+            parts.append("<missing>")
+            continue
+        if _is_mime_type_raml(file_type):
+            parts.extend(_collect_include_contents(content, os.path.dirname(full_path), seen))
+        else:
+            parts.append(content)
+    return parts
+
+
+def parse(c, relative_path, lazy=False):
     """
     Parse RAML file
 
     :param c: file content
     :type c: str
+    :param lazy: create LazyRamlResource proxies instead of parsing the resources
+    :type lazy: bool
     :return:
     """
 
@@ -139,7 +265,7 @@ def parse(c, relative_path):
     #except:
     #    pass
       
-    context = ParseContext(yaml.load(c), relative_path)
+    context = ParseContext(load_yaml(c), relative_path)
 
     root = RamlRoot(raml_version=raml_version)
     root.title = context.get_string_property('title', True)
@@ -158,7 +284,7 @@ def parse(c, relative_path):
     resources = OrderedDict()
     for property_name in context.__iter__():
         if property_name.startswith("/"):
-            resources[property_name] = parse_resource(context, property_name, root)
+            resources[property_name] = _parse_or_defer_resource(context, property_name, root, lazy)
 
     if resources > 0:
         root.resources = resources
@@ -166,7 +292,60 @@ def parse(c, relative_path):
     return root
 
 
-def parse_resource(c, property_name, parent_object):
+class LazyRamlResource(object):
+    """
+    Proxy of a RamlResource that is parsed on first attribute access.
+    Until then only the parse context is kept, e.g. methods, bodies and includes of the resource are not loaded.
+    A tree can be shared between threads, the resource is parsed only once.
+    """
+    _resolve_lock = threading.RLock()
+
+    def __init__(self, c, property_name, parent_object):
+        object.__setattr__(self, "_lazy_args", (c, property_name, parent_object))
+        object.__setattr__(self, "_resource", None)
+
+    def resolve(self):
+        """
+        Parse the resource (once)
+
+        :return: the parsed resource
+        :rtype: RamlResource
+        """
+        if self._lazy_args is not None:
+            with self._resolve_lock:
+                lazy_args = self._lazy_args
+                if lazy_args is not None:
+                    c, property_name, parent_object = lazy_args
+                    object.__setattr__(self, "_resource", parse_resource(c, property_name, parent_object, lazy=True))
+                    object.__setattr__(self, "_lazy_args", None)
+        return self._resource
+
+    def __getattr__(self, name):
+        # only called for attributes that are not on the proxy itself
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.resolve(), name, value)
+
+    def __repr__(self):
+        if self._lazy_args is not None:
+            return "{}({})".format(self.__class__.__name__, self._lazy_args[1])
+        return repr(self._resource)
+
+
+def _parse_or_defer_resource(c, property_name, parent_object, lazy):
+    """
+    Parse the resource or, in lazy mode, create a proxy that parses it on first use.
+    Empty resources are returned as None in both modes.
+    """
+    if not lazy:
+        return parse_resource(c, property_name, parent_object)
+    if not c.data.get(property_name):
+        return None
+    return LazyRamlResource(c, property_name, parent_object)
+
+
+def parse_resource(c, property_name, parent_object, lazy=False):
     """
     Parse and extract resource with name
 
@@ -179,6 +358,9 @@ def parse_resource(c, property_name, parent_object):
     :param property_name: resource name to extract
     :type property_name: str
 
+    :param lazy: create LazyRamlResource proxies for the sub resources
+    :type lazy: bool
+
     :return: RamlResource  or None
     :rtype: RamlResource
     """
@@ -215,7 +397,7 @@ def parse_resource(c, property_name, parent_object):
     resources = OrderedDict()
     for property_name in new_context.__iter__():
         if property_name.startswith("/"):
-            resources[property_name] = parse_resource(new_context, property_name, resource)
+            resources[property_name] = _parse_or_defer_resource(new_context, property_name, resource, lazy)
 
     if resources > 0:
         resource.resources = resources
@@ -464,6 +646,20 @@ def _calculate_new_relative_path(base, uri):
         return os.path.dirname(os.path.join(base, uri))
 
 
+def _local_file_stamp(full_path):
+    """
+    Stamp used to detect changes of a local file
+
+    :return: 2 elements tuple: modification time and size, None if the file does not exist
+    :rtype: tuple or None
+    """
+    try:
+        st = os.stat(full_path)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
 def _load_local_file(full_path):
     # include locates at local file system
     full_path = Path(full_path).absolute()
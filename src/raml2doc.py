@@ -16,8 +16,10 @@
 
 try:
     import pyramloic.parser as ramlparser
+    from pyramloic.cache import ParseCache
 except ImportError:
     import pyraml.parser as ramlparser
+    ParseCache = None
 
     pass
 #
@@ -28,12 +30,29 @@ import os
 import sys
 import traceback
 import argparse
+import threading
+import hashlib
+import itertools
+import multiprocessing
+import urlparse
+import urllib
+import copy
+import tempfile
+import textlayout
+from multiprocessing.pool import ThreadPool
+from StringIO import StringIO
+from collections import OrderedDict, deque
 from os import listdir
 from os.path import isfile, join
 #
 # docx imports
 #
 from docx import Document
+from docx.text.paragraph import Paragraph
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Emu
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 # fix for py2exe
 from jsonschema import _utils
@@ -489,6 +508,7 @@ draft4schemafile = """{
 try:
     from jsonschema import Draft4Validator
     from jsonschema import ValidationError
+    from jsonschema import RefResolver, RefResolutionError
 except:
     # os.mkdir('./jsonschema/schema/')
     f = open("draft3.json", "w")
@@ -498,6 +518,7 @@ except:
     f.write(draft4schemafile)
     f.close()
     from jsonschema import Draft4Validator
+    from jsonschema import RefResolver, RefResolutionError
 
 def clean_dict(d):
     for key, value in d.iteritems():
@@ -548,22 +569,646 @@ def fix_references_list(l):
         else:
             pass
 
+
+def sorted_dict(value):
+    """
+    copy of an decoded json value with the keys of all dicts sorted (as json.dumps with sort_keys)
+    :param value: decoded json value
+    :return: copy, dicts are OrderedDict
+    """
+    if isinstance(value, dict):
+        return OrderedDict((key, sorted_dict(value[key])) for key in sorted(value.keys()))
+    if isinstance(value, list):
+        return [sorted_dict(item) for item in value]
+    return value
+
+class FrozenDict(dict):
+    """
+    read-only dict, as handed out by the schema registry
+    use thaw() to get an modifiable copy
+    the order of the keys in the json text is kept, so that an copy iterates in the same order
+    as an freshly decoded dict.
+    """
+    def __init__(self, pairs=()):
+        pairs = list(pairs)
+        dict.__init__(self, pairs)
+        key_order = []
+        seen = set()
+        for key, _ in pairs:
+            if key not in seen:
+                seen.add(key)
+                key_order.append(key)
+        self.key_order = key_order
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("schema is read-only, use thaw() to get an modifiable copy")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+    # SchemaIndex of the schema this dict is part of, see get_schema_index
+    schema_index = None
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return FrozenDict, ([(key, self[key]) for key in self.key_order],)
+
+
+class FrozenList(list):
+    """
+    read-only list, as handed out by the schema registry
+    use thaw() to get an modifiable copy
+    """
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("schema is read-only, use thaw() to get an modifiable copy")
+
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = reverse = sort = _read_only
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+
+def _frozen_value(value):
+    """
+    read-only version of an decoded json value, strings are cleaned as done by clean_dict
+    objects are already converted by the object hook of the decoder
+    """
+    if isinstance(value, list):
+        return FrozenList(_frozen_value(item) for item in value)
+    if isinstance(value, str):
+        return value.replace("\n","").replace("\r","")
+    return value
+
+
+def _frozen_object(pairs):
+    """
+    object hook for the json decoder: creates the read-only dicts
+    """
+    return FrozenDict((key, _frozen_value(value)) for key, value in pairs)
+
+
+def loads_frozen(text):
+    """
+    decode an json text into an read-only (and cleaned) json structure
+    :param text: json text
+    :return: FrozenDict, FrozenList or an json scalar
+    """
+    return _frozen_value(json.loads(text, object_pairs_hook=_frozen_object))
+
+
+def thaw(value, replace=None):
+    """
+    convert an (read-only) json structure into an modifiable copy
+    :param value: json structure
+    :param replace: dict id of an part of the structure -> value used instead of an copy of that part
+    :return: dict, list or the value itself
+    """
+    if replace is not None and id(value) in replace:
+        return replace[id(value)]
+    if isinstance(value, FrozenDict):
+        # insert in json text order: the copy has the same (python 2) iteration order as json.loads
+        copy = {}
+        for key in value.key_order:
+            copy[key] = thaw(value[key], replace)
+        return copy
+    if isinstance(value, dict):
+        return dict((key, thaw(item, replace)) for key, item in value.items())
+    if isinstance(value, list):
+        return [thaw(item, replace) for item in value]
+    return value
+
+
+def content_hash(text):
+    """
+    hash of an (schema) text, used as key in the caches
+    :param text: str or unicode
+    :return: hex digest
+    """
+    if isinstance(text, unicode):
+        text = text.encode("utf-8")
+    return hashlib.sha1(text).hexdigest()
+
+
+def json_content_hash(value):
+    """
+    hash of an decoded json value, independent of the order of the keys
+    :param value: decoded json value
+    :return: hex digest
+    """
+    return content_hash(json.dumps(value, sort_keys=True, separators=(',', ':')))
+
+
+class SchemaRegistry(object):
+    """
+    registry of the json texts (schemas and examples) used by the tool
+    - files are read once, keyed by the absolute path
+    - texts are decoded once, keyed by the content hash
+    the decoded (and cleaned, see clean_dict) json is handed out as read-only view.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._texts = {}
+        self._schemas = {}
+        # counters
+        self.reads = 0
+        self.loads = 0
+        self.hits = 0
+        self.bytes_saved = 0
+
+    def read(self, filename):
+        """
+        read the file as a string, only the first call reads the file from disk
+        :param filename: file to read
+        :return: file contents
+        :raises IOError: if the file could not be read
+        """
+        full_path = os.path.abspath(filename)
+        text = self._texts.get(full_path)
+        if text is not None:
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += len(text)
+            return text
+        with open(full_path, 'r') as f:
+            text = f.read()
+        with self._lock:
+            self.reads += 1
+            self._texts[full_path] = text
+        return text
+
+    def parse(self, text):
+        """
+        decode an json text, only the first call for the same contents decodes the text
+        :param text: json text
+        :return: read-only json structure
+        :raises ValueError: if the text is not valid json
+        """
+        key = content_hash(text)
+        json_dict = self._schemas.get(key)
+        if json_dict is not None:
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += len(text)
+            return json_dict
+        json_dict = loads_frozen(text)
+        with self._lock:
+            self.loads += 1
+            self._schemas[key] = json_dict
+        return json_dict
+
+    def load_file(self, filename):
+        """
+        read and decode an json file
+        :param filename: file to read
+        :return: read-only json structure
+        """
+        return self.parse(self.read(filename))
+
+    def stats(self):
+        """
+        counters of the registry
+        :return: dict
+        """
+        with self._lock:
+            return {"reads": self.reads, "loads": self.loads, "hits": self.hits, "bytes_saved": self.bytes_saved}
+
+
+# process wide registry of json texts
+schema_registry = SchemaRegistry()
+
+
+def error_sort_key(error):
+    """
+    sort key of an validation error: location in the instance, then the message
+    (cheaper than formatting the complete error as a string)
+    :param error: ValidationError
+    :return: tuple
+    """
+    return list(error.path), error.message
+
+
+def validation_errors(validator, instance, max_errors=None):
+    """
+    validate the instance, sorted list of errors
+    :param validator: Draft4Validator
+    :param instance: json structure
+    :param max_errors: stop after max_errors errors (None or 0: all errors)
+    :return: list of ValidationError
+    """
+    errors = validator.iter_errors(instance)
+    if max_errors:
+        errors = itertools.islice(errors, max_errors)
+    return sorted(errors, key=error_sort_key)
+
+
+class SchemaDirectory(object):
+    """
+    index of the files in one or more schema directories, built once (at the first lookup)
+    - path relative to the directory, file name and file name without extension -> absolute path
+    - schema id -> absolute path, the json files are only read for this when an id is looked up
+    the first directory (and the first file found while scanning) wins.
+    names that are looked up are remembered, also when they are not found.
+    """
+    def __init__(self, schema_dirs, recursive=False):
+        self.schema_dirs = [schema_dir for schema_dir in schema_dirs if schema_dir is not None]
+        self.recursive = recursive
+        self._lock = threading.RLock()
+        self._paths = None
+        self._path_set = None
+        self._by_relpath = None
+        self._by_name = None
+        self._by_base = None
+        self._by_id = None
+        self._found = {}
+        self._missing = set()
+        # counters
+        self.hits = 0
+        self.misses = 0
+
+    def _scan(self, schema_dir):
+        """
+        :return: list of paths relative to schema_dir
+        """
+        if self.recursive is False:
+            return sorted(get_dir_list(schema_dir))
+        relpaths = []
+        for root, dirs, files in os.walk(schema_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.endswith(".bak"):
+                    relpaths.append(os.path.relpath(os.path.join(root, name), schema_dir))
+        return relpaths
+
+    def _index(self):
+        paths = []
+        by_relpath = {}
+        by_name = {}
+        by_base = {}
+        for schema_dir in self.schema_dirs:
+            try:
+                relpaths = self._scan(schema_dir)
+            except OSError as e:
+                print "SchemaDirectory: could not list schema dir:", schema_dir, e
+                continue
+            for relpath in relpaths:
+                full_path = os.path.abspath(os.path.join(schema_dir, relpath))
+                name = os.path.basename(relpath)
+                paths.append(full_path)
+                by_relpath.setdefault(relpath.replace(os.sep, "/"), full_path)
+                by_name.setdefault(name, full_path)
+                by_base.setdefault(os.path.splitext(name)[0], full_path)
+        self._by_relpath = by_relpath
+        self._by_name = by_name
+        self._by_base = by_base
+        self._path_set = set(paths)
+        # set last: the index is complete when _paths is set, see _ensure_index
+        self._paths = paths
+
+    def _ensure_index(self):
+        if self._paths is None:
+            with self._lock:
+                if self._paths is None:
+                    self._index()
+
+    def files(self, ext=None, schema_dir=None):
+        """
+        indexed files
+        :param ext: filter on extension
+        :param schema_dir: only the files directly in this directory
+        :return: list of absolute paths
+        """
+        self._ensure_index()
+        paths = self._paths
+        if schema_dir is not None:
+            schema_dir = os.path.abspath(schema_dir)
+            paths = [path for path in paths if os.path.dirname(path) == schema_dir]
+        if ext is not None:
+            paths = [path for path in paths if path.endswith(ext)]
+        return paths
+
+    def find(self, filename):
+        """
+        find an file: the file itself, or by path relative to, name or name without extension in the schema dirs
+        :param filename: file name or path
+        :return: absolute path or None
+        """
+        self._ensure_index()
+        with self._lock:
+            if filename in self._found:
+                self.hits += 1
+                return self._found[filename]
+            if filename in self._missing:
+                self.hits += 1
+                return None
+            self.misses += 1
+        full_path = os.path.abspath(filename)
+        if full_path not in self._path_set and not os.path.isfile(full_path):
+            name = filename.replace(os.sep, "/")
+            full_path = self._by_relpath.get(name)
+            if full_path is None:
+                name = name.rstrip("/").split("/")[-1]
+                full_path = self._by_name.get(name) or self._by_base.get(name)
+        with self._lock:
+            if full_path is None:
+                self._missing.add(filename)
+            else:
+                self._found[filename] = full_path
+        return full_path
+
+    def find_id(self, schema_id, registry):
+        """
+        find an json schema file by the id in the schema
+        :param schema_id: id (without fragment)
+        :param registry: SchemaRegistry used to read the json files
+        :return: absolute path or None
+        """
+        self._ensure_index()
+        with self._lock:
+            if self._by_id is None:
+                by_id = {}
+                for full_path in self.files(".json"):
+                    try:
+                        schema = registry.load_file(full_path)
+                    except (IOError, ValueError) as e:
+                        print "SchemaDirectory: skipping schema:", full_path, e
+                        continue
+                    if isinstance(schema, dict) and isinstance(schema.get("id"), basestring):
+                        by_id.setdefault(schema["id"].rstrip("#"), full_path)
+                self._by_id = by_id
+        return self._by_id.get(schema_id.rstrip("#"))
+
+    def stats(self):
+        """
+        counters of the index
+        :return: dict
+        """
+        self._ensure_index()
+        with self._lock:
+            return {"files": len(self._paths), "hits": self.hits, "misses": self.misses,
+                    "not_found": len(self._missing)}
+
+
+class SchemaStore(object):
+    """
+    in-process store of the schemas in the schema directories, used to resolve $ref without network access
+    an reference is found by the file name (with or without extension) or by the id in the schema.
+    """
+    def __init__(self, schema_directory, registry):
+        self.schema_directory = schema_directory
+        self.registry = registry
+        self._lock = threading.Lock()
+        # counters
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, uri):
+        """
+        find the schema of an (remote) reference
+        :param uri: uri of the referenced schema (fragment is ignored)
+        :return: read-only schema or None if the schema is not in the store
+        """
+        url = urlparse.urldefrag(uri)[0]
+        name = url.rstrip("/").split("/")[-1]
+        full_path = None
+        if name:
+            full_path = self.schema_directory.find(name)
+        if full_path is None:
+            full_path = self.schema_directory.find_id(url, self.registry)
+        with self._lock:
+            if full_path is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self.registry.load_file(full_path)
+
+    def stats(self):
+        """
+        counters of the store
+        :return: dict
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+class OfflineRefResolver(RefResolver):
+    """
+    reference resolver that takes remote references from an SchemaStore
+    references that are not in the store are fetched from the network (e.g. via the proxy)
+    only when use_network is set.
+    """
+    def __init__(self, base_uri, referrer, schema_store, use_network=False, **kwargs):
+        RefResolver.__init__(self, base_uri, referrer, **kwargs)
+        self.schema_store = schema_store
+        self.use_network = use_network
+
+    def resolve_remote(self, uri):
+        document = self.schema_store.lookup(uri)
+        if document is None:
+            if self.use_network is False:
+                raise RefResolutionError("reference not found in the schema dir: %s (use --proxy true to fetch it)" % uri)
+            return RefResolver.resolve_remote(self, uri)
+        if self.cache_remote:
+            self.store[uri] = document
+        return document
+
+
+class ValidatorCache(object):
+    """
+    cache of the json schema validators, keyed by the content hash of the schema
+    the validator (and the references resolved by it) are reused by all examples using the same schema
+    with an schema_store the remote references are resolved in-process (see OfflineRefResolver)
+    """
+    def __init__(self, registry):
+        self._lock = threading.Lock()
+        self._validators = {}
+        self.registry = registry
+        self.schema_store = None
+        self.use_network = True
+        # counters
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, schema_directory, use_network):
+        """
+        resolve the remote references with the schemas in the schema directories
+        :param schema_directory: SchemaDirectory, None: references are resolved by jsonschema
+        :param use_network: fetch references that are not in the directories from the network
+        """
+        with self._lock:
+            self.schema_store = None
+            if schema_directory is not None:
+                self.schema_store = SchemaStore(schema_directory, self.registry)
+            self.use_network = use_network
+            self._validators = {}
+
+    def get(self, schema_text):
+        """
+        validator of the schema
+        :param schema_text: json text of the schema
+        :return: Draft4Validator
+        :raises ValueError: if the schema is not valid json
+        """
+        key = content_hash(schema_text)
+        with self._lock:
+            validator = self._validators.get(key)
+            if validator is not None:
+                self.hits += 1
+                return validator
+        schema = self.registry.parse(schema_text)
+        resolver = None
+        if self.schema_store is not None:
+            resolver = OfflineRefResolver(schema.get(u"id", u""), schema, self.schema_store,
+                                          use_network=self.use_network)
+        validator = Draft4Validator(schema, resolver=resolver)
+        with self._lock:
+            self.misses += 1
+            self._validators[key] = validator
+        return validator
+
+    def stats(self):
+        """
+        counters of the cache
+        :return: dict
+        """
+        with self._lock:
+            return {"validators": len(self._validators), "hits": self.hits, "misses": self.misses}
+
+
+# process wide cache of json schema validators
+validator_cache = ValidatorCache(schema_registry)
+
+
+def report_text(value):
+    """
+    text of an value for the validation report, unicode is encoded as utf-8
+    (str() fails on non ascii unicode)
+    :param value: string, exception or other object
+    :return: byte string
+    """
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    try:
+        return str(value)
+    except UnicodeError:
+        return unicode(value).encode("utf-8")
+
+
+def validate_example(schema_string, example, max_errors=None):
+    """
+    validate the example against the schema
+    the report is returned instead of printed, so that this can run in an worker process
+    (see CreateDoc.validate_body for the lines around the report)
+
+    :param schema_string: json text of the schema
+    :param example: json text of the example
+    :param max_errors: stop after max_errors errors (None: all errors)
+    :return: tuple (valid, list of report lines)
+    """
+    lines = []
+    validation_error = False
+    try:
+        # validation by using package:
+        # https://pypi.python.org/pypi/jsonschema
+        v = None
+        v_example = None
+        try:
+            v = validator_cache.get(schema_string)
+        except ValueError as ex:
+            lines.append("error with loading schema:")
+            lines.append(report_text(ex))
+        try:
+            v_example = schema_registry.parse(example)
+        except ValueError as ex:
+            lines.append("error with loading example:")
+            lines.append(report_text(ex))
+
+        # Lazily report the errors in the instance, at most max_errors
+        try:
+            for error in validation_errors(v, v_example, max_errors):
+                validation_error = True
+                lines.append(report_text(error.message))
+                lines.append(report_text(error))
+
+        except ValidationError as e:
+            validation_error = True
+            lines.append("validation failed:")
+            lines.append(report_text(e.message))
+
+            for error in validation_errors(v, v_example, max_errors):
+                validation_error = True
+                lines.append(report_text(error.message))
+                lines.append(report_text(error))
+
+        if validation_error is True:
+            lines.append("validation failed, input information:")
+            lines.append("body (json):")
+            lines.append(report_text(example))
+            lines.append("")
+            lines.append("schema (json):")
+            lines.append(report_text(schema_string))
+        else:
+            lines.append("xx=xx=> schema & json VALID")
+    except Exception as e:
+        validation_error = True
+        lines.append("schema error: " + report_text(e))
+        lines.append("")
+        lines.append("ERROR: failure in body (json):")
+        lines.append(report_text(example))
+        lines.append("")
+        lines.append("schema (json):")
+        lines.append(report_text(schema_string))
+        lines.append("")
+
+    return not validation_error, lines
+
+
+def init_validation_worker(schema_dirs, recursive, use_network):
+    """
+    initializer of an validation worker process: same reference resolving as the main process
+    the configuration is passed explicitly, the module globals of the main process are not
+    inherited when the worker is spawned (windows).
+    :param schema_dirs: list of schema directories, None if not configured
+    :param recursive: see SchemaDirectory
+    :param use_network: see ValidatorCache.configure
+    """
+    schema_directory = None
+    if schema_dirs is not None:
+        schema_directory = SchemaDirectory(schema_dirs, recursive)
+    validator_cache.configure(schema_directory, use_network)
+
+
+def validate_example_task(task):
+    """
+    validate_example for an (worker) pool
+    :param task: tuple (schema_string, example, max_errors)
+    :return: tuple (valid, list of report lines)
+    """
+    return validate_example(*task)
+
+
 def load_json_schema(filename, dir):
     """
     load the JSON schema file
     :param filename: filename (with extension)
     :param dir: path to the file
-    :return: json dict
+    :return: json dict (modifiable copy)
     """
     full_path = os.path.join(dir,filename)
     if os.path.isfile(full_path) is False:
         print ("json file does not exist:", full_path)
 
-    linestring = open(full_path, 'r').read()
-    json_dict =json.loads(linestring)
-    clean_dict(json_dict)
-
-    return json_dict
+    return thaw(schema_registry.load_file(full_path))
 
 
 def get_dir_list(dir, ext=None):
@@ -606,42 +1251,1207 @@ def find_key(rec_dict, target, depth=0):
         traceback.print_exc()
 
 
+# json schema keywords combining (sub) schemas
+COMPOSITION_KEYWORDS = ["oneOf", "allOf", "anyOf"]
+
+
+class SchemaIndex(object):
+    """
+    index of an json schema, built in one traversal:
+    for every object in the schema the result of find_key_link for all keys in that object
+    the index of an read-only schema (FrozenDict) is kept with the schema, see get_schema_index
+    """
+    def __init__(self, schema):
+        self.schema = schema
+        # id of an object in the schema -> dict key -> find_key_link result
+        self._links = {}
+        # keeps the objects alive, the ids are used as keys
+        self._nodes = []
+        self._walk(schema)
+
+    def _walk(self, node):
+        """
+        index the node and everything below it
+        :return: find_key_link results of an object, None for other values
+        """
+        if isinstance(node, list):
+            for item in node:
+                self._walk(item)
+            return None
+        if not isinstance(node, dict):
+            return None
+
+        self._nodes.append(node)
+        if isinstance(node, FrozenDict) and node.schema_index is None:
+            node.schema_index = self
+
+        # key in an object below this object: the first one found
+        link = {}
+        for key, value in node.items():
+            child_link = self._walk(value)
+            if child_link is not None:
+                for target, result in child_link.items():
+                    if result is not None and target not in link:
+                        link[target] = result
+
+        # key in an composition array: overrides the nested ones, the last one found
+        # an item that equals the key ends the search for that key
+        composition = {}
+        done = set()
+        for key, value in node.items():
+            if key in COMPOSITION_KEYWORDS and isinstance(value, (list, dict, basestring)):
+                for item in value:
+                    if isinstance(item, dict):
+                        for target, result in self._links[id(item)].items():
+                            if result is not None and target not in done:
+                                composition[target] = result
+                    elif isinstance(item, basestring) and item not in done:
+                        composition[item] = item
+                        done.add(item)
+        link.update(composition)
+
+        # direct key: overrides everything
+        link.update(node)
+        self._links[id(node)] = link
+        return link
+
+    def has_node(self, node):
+        """
+        :param node: object
+        :return: True if the object is part of the indexed schema
+        """
+        return id(node) in self._links
+
+    def link(self, node, key):
+        """
+        find_key_link on an object of the indexed schema
+        :param node: object of the indexed schema
+        :param key: key to search for
+        :return: value or None
+        """
+        return self._links[id(node)].get(key)
+
+
+def get_schema_index(schema):
+    """
+    index of an read-only schema, built once and kept with the schema
+    (modifiable dicts are not indexed, they can change after the index is built)
+    :param schema: FrozenDict
+    :return: SchemaIndex
+    """
+    index = schema.schema_index
+    if index is not None and index.has_node(schema):
+        return index
+    return SchemaIndex(schema)
+
+
+def resolve_json_pointer(document, pointer):
+    """
+    find the value of an json pointer (RFC 6901) in an document
+    :param document: json structure
+    :param pointer: json pointer, "" is the whole document
+    :return: value
+    :raises KeyError, IndexError, ValueError: if the pointer does not exist in the document
+    """
+    value = document
+    if pointer in ["", "/"]:
+        return value
+    for part in pointer.lstrip("/").split("/"):
+        part = urllib.unquote(part).replace("~1", "/").replace("~0", "~")
+        if isinstance(value, list):
+            value = value[int(part)]
+        else:
+            value = value[part]
+    return value
+
+
+class SchemaDereferencer(object):
+    """
+    resolves the $ref in json schemas, local ("#/definitions/x") and to other files ("file.json#/definitions/x")
+    - the referenced sub schemas are resolved to any depth and memoized by (file, json pointer)
+    - an reference back to an sub schema that is being resolved (cycle) is kept as $ref
+    - the results are read-only (FrozenDict/FrozenList), parts without references are shared with the input
+    files are identified by the content hash of the text.
+    """
+    def __init__(self, load_file):
+        """
+        :param load_file: function filename -> (file key, read-only schema), (None, None) if the file can't be loaded
+        """
+        self.load_file = load_file
+        self._lock = threading.Lock()
+        self._documents = {}
+        self._files = {}
+        self._resolved = {}
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.cycles = 0
+
+    def add_document(self, file_key, schema):
+        """
+        register an document (e.g. an schema text of an body) so that local references can be resolved
+        :param file_key: key of the document, e.g. the content hash of the text
+        :param schema: read-only schema
+        """
+        with self._lock:
+            self._documents[file_key] = schema
+
+    def _file_key(self, filename):
+        with self._lock:
+            if filename in self._files:
+                return self._files[filename]
+        file_key, schema = self.load_file(filename)
+        with self._lock:
+            self._files[filename] = file_key
+            if file_key is not None:
+                self._documents[file_key] = schema
+        return file_key
+
+    def bundle(self, node, file_key):
+        """
+        resolve all references in (a part of) an document
+        :param node: json structure, part of the document file_key
+        :param file_key: key of the document the local references point into
+        :return: read-only json structure without references (except for cycles and references that can't be resolved)
+        """
+        return self._bundle_node(node, file_key, [])
+
+    def resolve(self, ref, file_key):
+        """
+        resolve an reference
+        :param ref: $ref value
+        :param file_key: key of the document containing the reference
+        :return: read-only json structure or None if the reference can't be resolved
+        """
+        return self._resolve(ref, file_key, [])
+
+    def _resolve(self, ref, file_key, stack):
+        url, fragment = urlparse.urldefrag(ref)
+        if url:
+            file_key = self._file_key(url)
+            if file_key is None:
+                print "SchemaDereferencer: could not load reference:", ref
+                return None
+        memo_key = (file_key, fragment)
+        with self._lock:
+            if memo_key in self._resolved:
+                self.hits += 1
+                return self._resolved[memo_key]
+            if memo_key in stack:
+                self.cycles += 1
+                print "SchemaDereferencer: cycle, keeping reference:", ref
+                return None
+            self.misses += 1
+            document = self._documents.get(file_key)
+        try:
+            target = resolve_json_pointer(document, fragment)
+        except (KeyError, IndexError, ValueError, TypeError):
+            print "SchemaDereferencer: could not resolve reference:", ref
+            return None
+        stack.append(memo_key)
+        try:
+            result = self._bundle_node(target, file_key, stack)
+        finally:
+            stack.pop()
+        with self._lock:
+            self._resolved[memo_key] = result
+        return result
+
+    def _bundle_node(self, node, file_key, stack):
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, basestring):
+                result = self._resolve(ref, file_key, stack)
+                if result is None:
+                    return node
+                return result
+            keys = getattr(node, "key_order", None) or node.keys()
+            pairs = []
+            changed = False
+            for key in keys:
+                value = node[key]
+                new_value = self._bundle_node(value, file_key, stack)
+                if new_value is not value:
+                    changed = True
+                pairs.append((key, new_value))
+            if changed or not isinstance(node, FrozenDict):
+                return FrozenDict(pairs)
+            return node
+        if isinstance(node, list):
+            items = [self._bundle_node(item, file_key, stack) for item in node]
+            if isinstance(node, FrozenList) and all(new is old for new, old in zip(items, node)):
+                return node
+            return FrozenList(items)
+        return node
+
+    def stats(self):
+        """
+        counters of the dereferencer
+        :return: dict
+        """
+        with self._lock:
+            return {"resolved": len(self._resolved), "hits": self.hits, "misses": self.misses, "cycles": self.cycles}
+
+
+class MergedProperties(object):
+    """
+    merged view of the properties of an (dereferenced) json schema
+    the properties of the schema itself and of the schemas in allOf/oneOf/anyOf are combined:
+    - names: property names, in the order they are found (own properties first)
+    - schemas: name -> merged property schema, later definitions (e.g. the resource itself after
+      oic.core and oic.baseResource in allOf) override the keys of earlier ones
+    - required: names of the required properties, of the schema itself and its allOf schemas
+      (required in an oneOf/anyOf alternative does not make the property required)
+    """
+    def __init__(self, schema):
+        self.names = []
+        self.schemas = {}
+        self.required = set()
+        self._nested = {}
+        definitions = {}
+        self._collect(schema, definitions)
+        if not self.names:
+            # no properties on the schema or in the composition, e.g. only in an object further down
+            properties = find_key_link(schema, 'properties')
+            if isinstance(properties, dict):
+                self._collect({'properties': properties}, definitions)
+        for name in self.names:
+            pairs = []
+            for definition in definitions[name]:
+                if isinstance(definition, dict):
+                    pairs.extend(definition.items())
+            self.schemas[name] = FrozenDict(pairs)
+
+    def _collect(self, schema, definitions, with_required=True):
+        if not isinstance(schema, dict):
+            return
+        properties = schema.get('properties')
+        if not isinstance(properties, dict):
+            properties = {}
+        for name in properties:
+            if name not in definitions:
+                definitions[name] = []
+                self.names.append(name)
+        for key in getattr(schema, "key_order", None) or schema.keys():
+            if key in COMPOSITION_KEYWORDS and isinstance(schema[key], list):
+                for item in schema[key]:
+                    self._collect(item, definitions, with_required and key == 'allOf')
+        for name, definition in properties.items():
+            definitions[name].append(definition)
+        required = schema.get('required')
+        if with_required and isinstance(required, list):
+            self.required.update(name for name in required if isinstance(name, basestring))
+
+    def info(self, name):
+        """
+        :param name: property name
+        :return: dict with type, required, readOnly and description of the property
+        """
+        schema = self.schemas[name]
+        return {"type": schema.get('type'), "required": name in self.required,
+                "readOnly": schema.get('readOnly'), "description": schema.get('description')}
+
+    def nested(self, name):
+        """
+        merged view of the properties of an object or array (items) property
+        :param name: property name
+        :return: MergedProperties or None if the property has no properties
+        """
+        if name not in self._nested:
+            schema = self.schemas[name]
+            nested = None
+            if schema.get('type') in ["array", "object"]:
+                items = schema.get('items')
+                if isinstance(items, dict):
+                    schema = FrozenDict([('allOf', FrozenList([schema, items]))])
+                nested = MergedProperties(schema)
+                if not nested.names:
+                    nested = None
+            self._nested[name] = nested
+        return self._nested[name]
+
+
+class PropertyFlattener(object):
+    """
+    cache of the merged property views, keyed by the content hash of the schema
+    the schema is dereferenced first, so that the allOf references to other files are included
+    """
+    def __init__(self, dereferencer):
+        self.dereferencer = dereferencer
+        self._lock = threading.Lock()
+        self._views = {}
+        # counters
+        self.hits = 0
+        self.misses = 0
+
+    def view(self, file_key, schema):
+        """
+        merged property view of an schema
+        :param file_key: content hash of the schema text
+        :param schema: read-only schema
+        :return: MergedProperties
+        """
+        with self._lock:
+            view = self._views.get(file_key)
+            if view is not None:
+                self.hits += 1
+                return view
+        self.dereferencer.add_document(file_key, schema)
+        view = MergedProperties(self.dereferencer.bundle(schema, file_key))
+        with self._lock:
+            self.misses += 1
+            self._views[file_key] = view
+        return view
+
+    def stats(self):
+        """
+        counters of the cache
+        :return: dict
+        """
+        with self._lock:
+            return {"views": len(self._views), "hits": self.hits, "misses": self.misses}
+
+
+# header of the property tables
+PROPERTY_TABLE_HEADER = ['Property name', 'Value type', 'Mandatory', 'Access mode', 'Description']
+
+
+def add_element(parent, tag, attributes=()):
+    """
+    add an (word xml) element at the end of the parent
+    :param parent: lxml element
+    :param tag: tag with namespace prefix, e.g. w:tr
+    :param attributes: list of (name with namespace prefix, value), in the order they are written
+    :return: the new element
+    """
+    element = OxmlElement(tag)
+    for name, value in attributes:
+        element.set(qn(name), value)
+    parent.append(element)
+    return element
+
+
+def add_run_text(r, text):
+    """
+    add the text to an run (w:r), as python-docx does: tabs become w:tab, line breaks w:br
+    :param r: w:r element
+    :param text: text
+    """
+    for part in re.split(r'([\t\r\n])', text):
+        if part == '\t':
+            add_element(r, 'w:tab')
+        elif part in ['\r', '\n']:
+            add_element(r, 'w:br')
+        elif part:
+            t = add_element(r, 'w:t')
+            t.text = part
+            if len(part.strip()) < len(part):
+                t.set(qn('xml:space'), 'preserve')
+
+
+class TableBuilder(object):
+    """
+    collects the rows of an table in memory, the table is created in one go by add_to.
+    (adding rows one by one with python-docx gets slow for tables with many rows)
+    """
+    def __init__(self, header, style):
+        """
+        :param header: texts of the header row, determines the number of columns
+        :param style: table style (object, see DocumentStyles)
+        """
+        self.header = list(header)
+        self.style = style
+        self.rows = []
+
+    def add_row(self):
+        """
+        add an empty row
+        :return: list of cell texts to be filled in, cells that stay None are left empty
+        """
+        row = [None] * len(self.header)
+        self.rows.append(row)
+        return row
+
+    def add_to(self, document):
+        """
+        add the table with the header and all rows to the document
+        the table (w:tbl) is built as xml and added to the body once,
+        with the same layout as document.add_table: the column widths divide the page width.
+        :param document: document to add the table to
+        :return: the w:tbl element
+        """
+        cols = len(self.header)
+        section = document.sections[-1]
+        width = section.page_width - section.left_margin - section.right_margin
+        col_width = str(Emu(width / cols).twips if cols > 0 else 0)
+
+        tbl = OxmlElement('w:tbl')
+        tbl_pr = add_element(tbl, 'w:tblPr')
+        if self.style is not None:
+            style_id = document.part.get_style_id(self.style, WD_STYLE_TYPE.TABLE)
+            if style_id is not None:
+                add_element(tbl_pr, 'w:tblStyle', [('w:val', style_id)])
+        add_element(tbl_pr, 'w:tblW', [('w:type', 'auto'), ('w:w', '0')])
+        add_element(tbl_pr, 'w:tblLook', [('w:firstColumn', '1'), ('w:firstRow', '1'), ('w:lastColumn', '0'),
+                                          ('w:lastRow', '0'), ('w:noHBand', '0'), ('w:noVBand', '1'),
+                                          ('w:val', '04A0')])
+        tbl_grid = add_element(tbl, 'w:tblGrid')
+        for _ in range(cols):
+            add_element(tbl_grid, 'w:gridCol', [('w:w', col_width)])
+        for row in [self.header] + self.rows:
+            tr = add_element(tbl, 'w:tr')
+            for text in row:
+                tc = add_element(tr, 'w:tc')
+                tc_pr = add_element(tc, 'w:tcPr')
+                add_element(tc_pr, 'w:tcW', [('w:type', 'dxa'), ('w:w', col_width)])
+                p = add_element(tc, 'w:p')
+                if text is not None:
+                    add_run_text(add_element(p, 'w:r'), text)
+
+        body = document.element.body
+        sect_pr = body.find(qn('w:sectPr'))
+        if sect_pr is not None:
+            sect_pr.addprevious(tbl)
+        else:
+            body.append(tbl)
+        return tbl
+
+    def __len__(self):
+        return len(self.rows)
+
+
+# styles of the word template that are used in the generated document
+DOCUMENT_STYLES = ['CODE-AQUA', 'CODE-BLUE', 'CODE-GREY', 'CODE-YELLOW', 'CODE-BLACK', 'CODE-GREEN', 'TABLE-A',
+                   'ANNEX-heading1', 'ANNEX-heading2', 'ANNEX_title', 'CODE_GREY_C', 'CODE_YELLOW_C']
+# styles that may be missing in the template, the text then gets the style of the paragraph
+# (ResourceTemplate.docx has no CODE_YELLOW_C)
+OPTIONAL_DOCUMENT_STYLES = ['CODE_YELLOW_C']
+
+
+class DocumentStyles(object):
+    """
+    the styles of an document, looked up once by name.
+    raises KeyError when (non optional) styles are missing in the document,
+    missing optional styles are reported and stored as None
+    """
+    def __init__(self, document, names=DOCUMENT_STYLES, optional=OPTIONAL_DOCUMENT_STYLES):
+        """
+        :param document: document (from the word template)
+        :param names: style names to look up
+        :param optional: style names that may be missing
+        """
+        self.styles = {}
+        missing = []
+        missing_optional = []
+        for name in names:
+            try:
+                self.styles[name] = document.styles[name]
+            except KeyError:
+                if name not in optional:
+                    missing.append(name)
+                else:
+                    missing_optional.append(name)
+                    self.styles[name] = None
+        if len(missing) > 0:
+            raise KeyError("styles not found in template: " + ", ".join(missing))
+        if len(missing_optional) > 0:
+            print "template does not have all styles, not used: " + ", ".join(missing_optional)
+
+    def __getitem__(self, name):
+        return self.styles[name]
+
+
+class CodeLine(object):
+    """
+    one (styled) line of an CodeBlock
+    """
+    def __init__(self, text, style, alignment=None):
+        self.text = text
+        self.style = style
+        self.alignment = alignment
+        self.runs = []
+
+    def add_run(self, text, style=None, italic=None):
+        """
+        add text with an (character) style after the text of the line
+        :param text: text
+        :param style: character style (object, see DocumentStyles)
+        :param italic: italic flag of the text
+        """
+        self.runs.append((text, style, italic))
+
+
+class CodeBlock(object):
+    """
+    buffers the styled lines of the RAML definition section, write adds them all at once to the document.
+    the style ids are looked up once per style.
+    """
+    def __init__(self, document):
+        """
+        :param document: document to write to
+        """
+        self.document = document
+        self.lines = []
+        self.style_ids = {}
+
+    def add(self, text, style, alignment=None):
+        """
+        add an line, same arguments as document.add_paragraph
+        :param text: text of the line
+        :param style: paragraph style (object, see DocumentStyles)
+        :param alignment: paragraph alignment
+        :return: CodeLine
+        """
+        line = CodeLine(text, style, alignment)
+        self.lines.append(line)
+        return line
+
+    def style_id(self, style, style_type):
+        """
+        :param style: style object
+        :param style_type: WD_STYLE_TYPE
+        :return: style id of the style in the document
+        """
+        key = (style.style_id, style_type)
+        if key not in self.style_ids:
+            self.style_ids[key] = self.document.part.get_style_id(style, style_type)
+        return self.style_ids[key]
+
+    def write(self):
+        """
+        add the buffered lines to the end of the document (as paragraphs) and clear the buffer
+        """
+        body = self.document._body
+        sect_pr = body._element.sectPr
+        for line in self.lines:
+            p = OxmlElement('w:p')
+            paragraph = Paragraph(p, body)
+            if line.text:
+                paragraph.add_run(line.text)
+            if line.style is not None:
+                p.style = self.style_id(line.style, WD_STYLE_TYPE.PARAGRAPH)
+            for text, style, italic in line.runs:
+                run = paragraph.add_run(text)
+                if style is not None:
+                    run._r.style = self.style_id(style, WD_STYLE_TYPE.CHARACTER)
+                if italic is not None:
+                    run.italic = italic
+            if line.alignment is not None:
+                paragraph.alignment = line.alignment
+            if sect_pr is not None:
+                sect_pr.addprevious(p)
+            else:
+                body._element.append(p)
+        self.lines = []
+
+
+# methods in the columns of the CRUDN table: Create, Read, Update, Delete, Notify
+CRUDN_METHODS = ["put", "get", "post", "delete", "notify"]
+
+
+class ResourceRecord(object):
+    """
+    everything the sections need of one resource, collected by CreateDoc.visit_resources
+    """
+    def __init__(self, name, obj, level):
+        # name (relative uri) of the resource, e.g. /{link}
+        self.name = name
+        self.obj = obj
+        # 0 for an top level resource
+        self.level = level
+        self.description = None
+        self.display_name = None
+        # resource type, from the json response examples (top level resources only)
+        self.rt = None
+        # texts of the CRUDN table row, see CRUDN_METHODS
+        self.crudn = [""] * len(CRUDN_METHODS)
+        # schema texts of the 200 json responses of the table method (get or put)
+        self.table_schemas = []
+        # bodies of the methods and responses, in the order of the RAML definition section
+        self.bodies = []
+
+
+class TemplateCache(object):
+    """
+    cache of parsed word templates
+    the template package is parsed once, each new document is an deep copy of the parsed package.
+    an template that changed on disk (mtime, size) is parsed again.
+    only useful when several documents are created in one process (e.g. batch use), disabled by default:
+    for one document the deep copy costs more than parsing the template.
+    """
+    def __init__(self, enabled=False):
+        """
+        :param enabled: cache the templates, otherwise every document is loaded from the file
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._packages = {}
+        # counters
+        self.hits = 0
+        self.misses = 0
+
+    def document(self, docx_name):
+        """
+        new document based on the template
+        :param docx_name: word template file
+        :return: docx Document
+        :raises: if the template can't be loaded (as docx.Document)
+        """
+        if self.enabled is False:
+            return Document(docx=docx_name)
+        full_path = os.path.abspath(docx_name)
+        st = os.stat(full_path)
+        stamp = (st.st_mtime, st.st_size)
+        with self._lock:
+            entry = self._packages.get(full_path)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                package = entry[1]
+            else:
+                self.misses += 1
+                package = Document(docx=full_path).part.package
+                self._packages[full_path] = (stamp, package)
+            package = copy.deepcopy(package)
+        return package.main_document_part.document
+
+    def stats(self):
+        """
+        counters of the cache
+        :return: dict
+        """
+        with self._lock:
+            return {"templates": len(self._packages), "hits": self.hits, "misses": self.misses}
+
+
+# process wide cache of word templates, enabled with --templatecache true
+template_cache = TemplateCache()
+
+
+def write_swagger(swagger, filename):
+    """
+    write the swagger object to file.
+    the json text is written while it is encoded, so the file is valid json by construction.
+    :param swagger: swagger object
+    :param filename: swagger output file
+    """
+    encoder = json.JSONEncoder(indent=2, separators=(',', ': '))
+    f = open(filename, "wb")
+    try:
+        for chunk in encoder.iterencode(swagger):
+            f.write(chunk)
+        f.write("\n")
+    finally:
+        f.close()
+
+
+def replace_references(value, references):
+    """
+    replace the $ref values (in place)
+    :param value: decoded json value (e.g. an swagger object)
+    :param references: dict old reference -> new reference
+    """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "$ref" and isinstance(item, basestring):
+                if item in references:
+                    value[key] = references[item]
+            else:
+                replace_references(item, references)
+    elif isinstance(value, list):
+        for item in value:
+            replace_references(item, references)
+
+
+def dedupe_swagger(swagger, sections=("parameters", "definitions")):
+    """
+    remove the parameters and definitions that have the same content (see json_content_hash)
+    as an earlier one in the same section, the references to them are replaced by references to the earlier one.
+    empty entries (e.g. the placeholder of an schema that could not be resolved) are not merged.
+    :param swagger: swagger object, changed in place
+    :param sections: sections to dedupe
+    :return: dict removed reference -> used reference
+    """
+    references = {}
+    for section in sections:
+        entries = swagger.get(section)
+        if not entries:
+            continue
+        used_names = {}
+        duplicates = []
+        for name, value in entries.items():
+            if not value:
+                continue
+            value_hash = json_content_hash(value)
+            if value_hash in used_names:
+                duplicates.append(name)
+                references["#/%s/%s" % (section, name)] = "#/%s/%s" % (section, used_names[value_hash])
+            else:
+                used_names[value_hash] = name
+        for name in duplicates:
+            print "dedupe_swagger: same content as", references["#/%s/%s" % (section, name)], ":", name
+            del entries[name]
+    if len(references) > 0:
+        replace_references(swagger, references)
+    return references
+
+
+# manifest of swag_process_schemas in the swagger output directory
+SCHEMA_MANIFEST = ".schemas.manifest.json"
+# bump when the snippets of swag_process_schemas change, all snippets are then written again
+SCHEMA_SNIPPET_FORMAT = 1
+
+
+def current_umask():
+    """
+    :return: the umask of the process (read by setting it, so call it before threads are started)
+    """
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mode of an newly created file, mkstemp creates the temporary files with 0600
+FILE_MODE = 0666 & ~current_umask()
+
+
+def write_file_atomic(full_path, text):
+    """
+    write the file via an temporary file in the same directory, readers never see an partial file
+    the file gets the mode of an file created with open (see FILE_MODE)
+    :param full_path: file name
+    :param text: contents
+    """
+    directory = os.path.dirname(os.path.abspath(full_path))
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.chmod(temp_path, FILE_MODE)
+        # rename over an existing file is not allowed on windows
+        if os.name == 'nt' and os.path.exists(full_path):
+            os.remove(full_path)
+        os.rename(temp_path, full_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class ThreadOutput(object):
+    """
+    replacement of sys.stdout that collects the output per thread (see collect),
+    so that the output of threads can be printed in order.
+    output of threads that do not collect goes to the stream.
+    """
+    def __init__(self, stream):
+        """
+        :param stream: stream for the output that is not collected
+        """
+        self.stream = stream
+        self._local = threading.local()
+
+    def _target(self):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            return self.stream
+        return buffer
+
+    def write(self, text):
+        self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    # the print statement keeps its state in the file object, per thread here
+    def _get_softspace(self):
+        return getattr(self._local, "softspace", 0)
+
+    def _set_softspace(self, value):
+        self._local.softspace = value
+
+    softspace = property(_get_softspace, _set_softspace)
+
+    def collect(self, function, *args):
+        """
+        call the function and collect what it prints
+        :param function: function to call
+        :param args: arguments
+        :return: tuple (result of the function, output text)
+        """
+        self._local.buffer = StringIO()
+        self._local.softspace = 0
+        try:
+            result = function(*args)
+        finally:
+            output = self._local.buffer.getvalue()
+            self._local.buffer = None
+            self._local.softspace = 0
+        return result, output
+
+
+def raml_files(inputs):
+    """
+    the raml files to process
+    :param inputs: list of raml files and directories (the .raml files in the directory are used)
+    :return: list of file names as given (relative names stay relative), each file once, sorted
+    """
+    files = {}
+    for name in inputs:
+        if os.path.isdir(name):
+            for entry in os.listdir(name):
+                if entry.endswith(".raml") and isfile(join(name, entry)):
+                    files.setdefault(os.path.abspath(join(name, entry)), os.path.normpath(join(name, entry)))
+        elif os.path.isfile(name):
+            files.setdefault(os.path.abspath(name), os.path.normpath(name))
+        else:
+            print "raml_files: not found:", name
+    return [files[full_path] for full_path in sorted(files)]
+
+
+# CreateDoc that writes the swagger output in an forked worker process, see CreateDoc.generate
+swagger_processor = None
+
+
+def swagger_output_task():
+    """
+    swagger output of swagger_processor, in the worker process forked by CreateDoc.generate
+    the output is collected and returned, so that it can be printed after the output of the word document
+    :return: tuple (False when the swagger output failed, output text)
+    """
+    output = StringIO()
+    stdout = sys.stdout
+    stderr = sys.stderr
+    sys.stdout = output
+    sys.stderr = output
+    try:
+        swagger_processor.generate_swagger_output()
+        done = True
+    except Exception:
+        traceback.print_exc()
+        done = False
+    finally:
+        sys.stdout = stdout
+        sys.stderr = stderr
+    return done, output.getvalue()
+
+
+def swagger_task(task):
+    """
+    swagger object of an raml file, for an (worker) pool
+    the output is collected and returned, so that it can be printed in the order of the files
+    :param task: tuple (raml file, schema dirs, recursive, parse cache dir)
+                 without schema dirs the directory of the raml file (and its sub directories) is used
+    :return: tuple (raml file, swagger object or None when the file could not be processed, output text)
+    """
+    raml_file, schema_dirs, recursive, parse_cache_dir = task
+    if not schema_dirs:
+        schema_dirs = [os.path.dirname(raml_file)]
+        recursive = True
+    output = StringIO()
+    stdout = sys.stdout
+    stderr = sys.stderr
+    sys.stdout = output
+    sys.stderr = output
+    try:
+        processor = CreateDoc(raml_file)
+        processor.dir = schema_dirs[0]
+        processor.schema_directory = SchemaDirectory(schema_dirs, recursive=recursive)
+        if parse_cache_dir is not None and ParseCache is not None:
+            processor.parse_cache = ParseCache(parse_cache_dir)
+        swagger = processor.swagger_document()
+    except Exception:
+        print "swagger_task: failed:", raml_file
+        traceback.print_exc()
+        swagger = None
+    finally:
+        sys.stdout = stdout
+        sys.stderr = stderr
+    return raml_file, swagger, output.getvalue()
+
+
+class SwaggerMerger(object):
+    """
+    merges the swagger objects of several raml files into one swagger object.
+    the operations of the paths, the parameters and the definitions are added once:
+    an entry with the same name and the same content (see json_content_hash) as an earlier one is skipped,
+    an entry with the same name and different content is an conflict, the earlier entry is kept.
+    """
+    SECTIONS = ["paths", "parameters", "definitions"]
+
+    def __init__(self):
+        self.swagger = None
+        self.titles = []
+        # (section, name[, method]) -> (source, content hash) of the entry that is used
+        self.entries = {}
+        # list of (section, name[, method]), used source, skipped source
+        self.conflicts = []
+        self.sources = 0
+
+    def add(self, source, swagger):
+        """
+        add an swagger object
+        :param source: name of the input (raml file), used in the conflict report
+        :param swagger: swagger object
+        """
+        self.sources += 1
+        if self.swagger is None:
+            self.swagger = OrderedDict((key, value) for key, value in swagger.items() if key not in self.SECTIONS)
+            for section in self.SECTIONS:
+                self.swagger[section] = OrderedDict()
+        title = swagger.get("info", {}).get("title")
+        if title is not None and title not in self.titles:
+            self.titles.append(title)
+
+        for path, operations in swagger.get("paths", {}).items():
+            merged_path = self.swagger["paths"].setdefault(path, OrderedDict())
+            for method, operation in operations.items():
+                self.add_entry(merged_path, ("paths", path, method), method, operation, source)
+        for section in ["parameters", "definitions"]:
+            for name, value in swagger.get(section, {}).items():
+                self.add_entry(self.swagger[section], (section, name), name, value, source)
+
+    def add_entry(self, target, key, name, value, source):
+        """
+        add the value to target, unless there is an entry with that name
+        :param target: dict to add to
+        :param key: key of the entry in the report
+        :param name: name in the target
+        :param value: value to add
+        :param source: name of the input
+        """
+        value_hash = json_content_hash(value)
+        entry = self.entries.get(key)
+        if entry is None:
+            target[name] = value
+            self.entries[key] = (source, value_hash)
+        elif entry[1] != value_hash:
+            self.conflicts.append((key, entry[0], source))
+
+    def result(self):
+        """
+        the merged swagger object, the paths, parameters and definitions are sorted by name
+        :return: swagger object, None if nothing was added
+        """
+        if self.swagger is None:
+            return None
+        swagger = OrderedDict(self.swagger)
+        if "info" in swagger and len(self.titles) > 1:
+            info = OrderedDict(swagger["info"])
+            info["title"] = ", ".join(self.titles)
+            swagger["info"] = info
+        for section in self.SECTIONS:
+            swagger[section] = OrderedDict(sorted(self.swagger[section].items()))
+        # the same parameters/definitions under different names (in different raml files) are added once
+        dedupe_swagger(swagger)
+        return swagger
+
+    def report(self):
+        """
+        print the conflicts and the totals
+        """
+        for key, used, skipped in self.conflicts:
+            print "swagger merge: CONFLICT:", "/".join(key)
+            print "    used   :", used
+            print "    skipped:", skipped
+        print "swagger merge: files:", self.sources,
+        if self.swagger is not None:
+            for section in self.SECTIONS:
+                print section + ":", len(self.swagger[section]),
+        print "conflicts:", len(self.conflicts)
+
+
+def generate_merged_swagger(inputs, swagger_file, schema_dirs=None, recursive=False, jobs=None,
+                            parse_cache_dir=None):
+    """
+    one swagger file for several raml files, the raml files are processed by an process pool
+    :param inputs: list of raml files and directories
+    :param swagger_file: swagger output file
+    :param schema_dirs: schema directories, None: the directory of each raml file
+    :param recursive: see SchemaDirectory
+    :param jobs: number of processes, None: number of cpus
+    :param parse_cache_dir: see ParseCache
+    :return: number of files that could not be processed plus the number of conflicts,
+             None if no swagger file was written
+    """
+    files = raml_files(inputs)
+    tasks = [(raml_file, schema_dirs, recursive, parse_cache_dir) for raml_file in files]
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    results = None
+    if jobs > 1 and len(tasks) > 1:
+        try:
+            pool = multiprocessing.Pool(min(jobs, len(tasks)))
+            try:
+                results = pool.map(swagger_task, tasks)
+            finally:
+                pool.close()
+                pool.join()
+        except Exception as e:
+            print "generate_merged_swagger: process pool failed, processing serially:", e
+            results = None
+    if results is None:
+        results = [swagger_task(task) for task in tasks]
+
+    merger = SwaggerMerger()
+    failed = 0
+    for raml_file, swagger, output in results:
+        sys.stdout.write(output)
+        if swagger is None:
+            print "swagger merge: SKIPPED (could not be processed):", raml_file
+            failed += 1
+        else:
+            merger.add(raml_file, swagger)
+    merger.report()
+
+    swagger = merger.result()
+    if swagger is None:
+        print "swagger merge: nothing to write"
+        return None
+    print "swagger merge: written:",
+    for section in SwaggerMerger.SECTIONS:
+        print section + ":", len(swagger[section]),
+    print
+    write_swagger(swagger, swagger_file)
+    print "swagger document saved..", swagger_file
+    return failed + len(merger.conflicts)
+
+
+class SchemaTableEntry(object):
+    """
+    schema declared in the schemas section of the RAML file
+    """
+    def __init__(self, name, file_name, text, json_dict, text_hash):
+        self.name = name
+        # None for an schema that is defined inline in the RAML file
+        self.file_name = file_name
+        self.text = text
+        # read-only, None if the text is not valid json
+        self.json = json_dict
+        self.hash = text_hash
+
+
+class SchemaTable(object):
+    """
+    the schemas of an parse tree by name, with the text, the decoded json and the content hash
+    the declarations are collected after loading the RAML file (see CreateDoc.load_parse_tree),
+    an schema is read and decoded when it is looked up for the first time.
+    """
+    def __init__(self, read_file=None, registry=None):
+        """
+        :param read_file: function filename -> text or None
+        :param registry: SchemaRegistry used to decode the texts
+        """
+        self.read_file = read_file
+        self.registry = registry
+        self._lock = threading.Lock()
+        # name -> (file name, inline text), the first declaration of an name
+        self._declarations = {}
+        self._entries = {}
+
+    @classmethod
+    def build(cls, parse_tree, read_file, registry):
+        """
+        :param parse_tree: RamlRoot
+        :param read_file: function filename -> text or None
+        :param registry: SchemaRegistry used to decode the texts
+        :return: SchemaTable
+        """
+        table = cls(read_file, registry)
+        schemas = getattr(parse_tree, "schemas", None)
+        if not isinstance(schemas, list):
+            return table
+        for item in schemas:
+            if not isinstance(item, dict):
+                continue
+            for name, obj in item.items():
+                file_name = getattr(obj, "file_name", None)
+                if file_name is not None:
+                    text = None
+                elif isinstance(obj, basestring):
+                    text = obj
+                else:
+                    continue
+                # first definition wins, as in the list scan
+                if name not in table._declarations:
+                    table._declarations[name] = (file_name, text)
+        return table
+
+    def _load(self, name):
+        """
+        read and decode an declared schema
+        :return: SchemaTableEntry
+        """
+        file_name, text = self._declarations[name]
+        if file_name is not None:
+            text = self.read_file(file_name)
+        json_dict = None
+        text_hash = None
+        if text is not None:
+            text_hash = content_hash(text)
+            try:
+                json_dict = self.registry.parse(text)
+            except ValueError as e:
+                print "SchemaTable: invalid json in schema:", name, e
+        return SchemaTableEntry(name, file_name, text, json_dict, text_hash)
+
+    def get(self, name):
+        """
+        :param name: schema name
+        :return: SchemaTableEntry or None
+        """
+        if name not in self._declarations:
+            return None
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._load(name)
+                self._entries[name] = entry
+        return entry
+
+    def __contains__(self, name):
+        return name in self._declarations
+
+    def __len__(self):
+        return len(self._declarations)
+
+
 def find_key_link(rec_dict, target, depth=0):
     """
     find the first key recursively
     also traverse lists (arrays, oneOf,..) but only returns the first occurance
+    precedence: direct key, key in the oneOf/allOf/anyOf arrays (last one), key in an object (first one)
+    read-only schemas are looked up in their index (see get_schema_index)
     :param rec_dict: dict to search in, json schema dict, so it is combination of dict and arrays
     :param target: target key to search for
     :param depth: depth of the search (recursion)
     :return:
     """
+    if isinstance(rec_dict, FrozenDict):
+        return get_schema_index(rec_dict).link(rec_dict, target)
     if isinstance(rec_dict, dict):
         # direct key
-        for key,value in rec_dict.items():
-            if key == target:
-                return rec_dict[key]
+        if target in rec_dict:
+            return rec_dict[target]
         # key is in array
-        rvalues = []
-        found = False
-        for key,value in rec_dict.items():
-            if key in ["oneOf", "allOf", "anyOf"]:
+        rvalues = None
+        for key, value in rec_dict.items():
+            if key in COMPOSITION_KEYWORDS and isinstance(value, (list, dict, basestring)):
                 for val in value:
-                    #print ("xxx", depth, key, val)
                     if val == target:
                         return val
                     if isinstance(val, dict):
-                        r = find_key_link(val, target, depth+1)
+                        r = find_key_link(val, target, depth + 1)
                         if r is not None:
-                            found = True
-                            # TODO: this should return an array, now it only returns the last found item
+                            # the last one found
                             rvalues = r
-        if found:
+        if rvalues is not None:
             return rvalues
         # key is an dict
-        for key,value in rec_dict.items():
-            r = find_key_link(value, target, depth+1)
+        for key, value in rec_dict.items():
+            r = find_key_link(value, target, depth + 1)
             if r is not None:
-                return r #[list(r.items())]
+                return r
 
 
 class CreateDoc(object):
@@ -665,10 +2475,37 @@ class CreateDoc(object):
         self.rt_provided_name = None
         self.fixed_uri = None
         self.swagger = None
+        self.parse_cache = None
+        self.dir = None
+        # index of the schema dir(s), created from self.dir when not set
+        self.schema_directory = None
         self.resourcedoc = "ResourceTemplate.docx"
         # internal variables
         self.table = None
         self.title = None
+        self.parsetree = None
+        # schemas of the parse tree by name, see SchemaTable
+        self.schema_table = SchemaTable()
+        # resources of the parse tree, see visit_resources
+        self.resource_records = None
+        # styles of self.document, see load_styles
+        self.styles = None
+        # buffer of the RAML definition section, see generate_sections
+        self.code = None
+        # read and decoded json texts, shared by the docx and swagger generation
+        self.registry = schema_registry
+        self.validators = validator_cache
+        self.dereferencer = SchemaDereferencer(self.load_schema_file)
+        self.flattener = PropertyFlattener(self.dereferencer)
+        # stop the validation of an example after max_errors errors (None: report all errors)
+        self.max_errors = None
+        # number of processes validating the examples (1: in this process)
+        self.validate_jobs = 1
+        # batch validation of the examples, see start_validation and validate_examples
+        self.validation_pool = None
+        self.validation_source = None
+        self.pending_validations = None
+        self.validation_results = {}
         self.inputname = name
 
         if docx_name is not None:
@@ -687,45 +2524,27 @@ class CreateDoc(object):
                                   "minimum", "maximum", "pattern", "readOnly", "minProperties", "additionalItems"]
         self.schema_types = ['boolean', 'array', 'object', 'enum', 'number', 'string']
 
-    def list_resource(self, level, lt_resource, lt_obj):
+    def list_resource(self, record):
         """
         function to list the CRUDN behavior per resource
-        e.g. it adds an entry to the CRUDN table
-        :param level:
-        :param resource:
-        :param obj:
+        e.g. it adds an entry to the CRUDN table
+        :param record: ResourceRecord
         :return:
         """
-        if lt_obj is None:
+        if record.obj is None:
             return
 
-        row_cells = self.table.add_row().cells
-        # row_cells[0].text = resource
+        row_cells = self.table.add_row()
+        # row_cells[0] = resource
         if self.fixed_uri is None:
-            row_cells[0].text = lt_resource
+            row_cells[0] = record.name
         else:
-            row_cells[0].text = self.fixed_uri
-
-        if lt_obj.methods is not None:
-            for method, mobj in lt_obj.methods.items():
-                # print "Method:",method
-                # PUT == Create
-                if method == "put":
-                    row_cells[1].text = method
-                # GET = Read
-                if method == "get":
-                    row_cells[2].text = method
-                # POST - update  (agreed on 05/02/2015)
-                if method == "post":
-                    row_cells[3].text = method
-                # DELETE = Delete
-                if method == "delete":
-                    row_cells[4].text = method
-                # NOTIFY = NOTIFY (does not exist)
-                if method == "notify":
-                    row_cells[5].text = method
-        for res_name, res_obj in lt_obj.resources.items():
-            self.list_resource(level + 1, res_name, res_obj)
+            row_cells[0] = self.fixed_uri
+        # PUT == Create, GET = Read, POST - update  (agreed on 05/02/2015), DELETE = Delete
+        # NOTIFY = NOTIFY (does not exist)
+        for index, method in enumerate(record.crudn):
+            if method:
+                row_cells[index + 1] = method
 
     def list_resources_crudn(self, parse_tree, select_resource=None):
         # function to create the CRUDN table
@@ -734,52 +2553,26 @@ class CreateDoc(object):
         :param parse_tree:
         :param select_resource:
         """
-        level = 0
         # create the table
-        self.table = self.document.add_table(rows=1, cols=6, style='TABLE-A')
-        hdr_cells = self.table.rows[0].cells
-        hdr_cells[0].text = 'Resource'
-        hdr_cells[1].text = 'Create'
-        hdr_cells[2].text = 'Read'
-        hdr_cells[3].text = 'Update'
-        hdr_cells[4].text = 'Delete'
-        hdr_cells[5].text = 'Notify'
-
-        if select_resource is None:
-            # all resources
-            for my_resource, my_obj in parse_tree.resources.items():
-                self.list_resource(level, my_resource, my_obj)
-        else:
-            for my_resource, my_obj in parse_tree.resources.items():
-                # only the one of the command line
-                if my_resource[1:] == select_resource:
-                    self.list_resource(level, my_resource, my_obj)
+        self.table = TableBuilder(['Resource', 'Create', 'Read', 'Update', 'Delete', 'Notify'],
+                                  self.styles['TABLE-A'])
 
-    def list_description(self, level, resource, obj, select_resource=None):
+        for record in self.visit_resources(parse_tree, select_resource):
+            self.list_resource(record)
+        self.table.add_to(self.document)
+
+    def list_description(self, record):
         """
 
-        :param level:
-        :param resource:
-        :param obj:
-        :param select_resource:
+        :param record: ResourceRecord
         :return:
         """
-        if obj is None:
+        if record.obj is None:
             return
 
-        if obj is not None:
-            if obj.description is not None:
-                intro_text = self.remove_eof_smart(obj.description)
-                self.document.add_paragraph(intro_text)
-        try:
-            for nResName, nObj in obj.resources.items():
-                if select_resource is None:
-                    self.list_description(level + 1, nResName, nObj, select_resource)
-                else:
-                    if nResName[1:] == select_resource:
-                        self.list_description(level + 1, nResName, nObj, select_resource)
-        except:
-            pass
+        if record.description is not None:
+            intro_text = self.remove_eof_smart(record.description)
+            self.document.add_paragraph(intro_text)
 
     def list_descriptions(self, parse_tree, select_resource=None):
         """
@@ -787,32 +2580,17 @@ class CreateDoc(object):
         :param parse_tree:
         :param select_resource:
         """
-        level = 0
-
-        if select_resource is None:
-            for resource, obj in parse_tree.resources.items():
-                self.list_description(level, resource, obj)
-        else:
-            for resource, obj in parse_tree.resources.items():
-                if select_resource == resource[1:]:
-                    self.list_description(level, resource, obj)
+        for record in self.visit_resources(parse_tree, select_resource):
+            self.list_description(record)
 
-    def list_uri(self, level, resource, obj):
+    def list_uri(self, record):
 
         """
 
-        :param level:
-        :param resource:
-        :param obj:
+        :param record: ResourceRecord
         """
-        if resource is not None:
-            self.document.add_paragraph(resource)
-
-        try:
-            for nResName, nObj in obj.resources.items():
-                self.list_uri(level + 1, nResName, nObj)
-        except:
-            pass
+        if record.name is not None:
+            self.document.add_paragraph(record.name)
 
     def list_URIs(self, parse_tree, select_resource=None):
         """
@@ -820,15 +2598,77 @@ class CreateDoc(object):
         :param parse_tree:
         :param select_resource:
         """
-        level = 0
+        for record in self.visit_resources(parse_tree, select_resource):
+            self.list_uri(record)
 
-        if select_resource is None:
-            for resource, obj in parse_tree.resources.items():
-                self.list_uri(level, resource, obj)
-        else:
-            for resource, obj in parse_tree.resources.items():
-                if select_resource == resource[1:]:
-                    self.list_uri(level, resource, obj)
+    def visit_resources(self, parse_tree, select_resource=None):
+        """
+        walk the resources of the parse tree once and collect the information of the sections
+        (description, uri, display name, rt, CRUDN row, property table schemas and bodies).
+        the result is kept, the next calls for the same tree and selection return the same records.
+
+        :param parse_tree: tree to walk
+        :param select_resource: only the selected resource (name without leading /)
+        :return: list of ResourceRecord, the selected resources and their sub resources (depth first)
+        """
+        key = (id(parse_tree), select_resource, self.table_method)
+        if self.resource_records is not None and self.resource_records[0] == key:
+            return self.resource_records[1]
+
+        records = []
+        for resource, obj in parse_tree.resources.items():
+            if select_resource is None or select_resource == resource[1:]:
+                self.visit_resource(records, 0, resource, obj, select_resource is not None)
+        self.resource_records = (key, records)
+        return records
+
+    def visit_resource(self, records, level, resource, obj, find_rt=False):
+        """
+        collect the information of the resource and its sub resources
+
+        :param records: list to add the ResourceRecord to
+        :param level: 0 for an top level resource
+        :param resource: resource name
+        :param obj: resource object
+        :param find_rt: look for the resource type in the json examples of the top level resource
+        """
+        record = ResourceRecord(resource, obj, level)
+        records.append(record)
+        if obj is None:
+            return
+        record.description = obj.description
+        record.display_name = obj.displayName
+
+        if obj.methods is not None:
+            for method, mobj in obj.methods.items():
+                if method in CRUDN_METHODS:
+                    record.crudn[CRUDN_METHODS.index(method)] = method
+                if mobj.body is not None:
+                    record.bodies.append(mobj.body)
+                if mobj.responses is None:
+                    continue
+                for res_name, res in mobj.responses.items():
+                    if res.body is None:
+                        continue
+                    for response_type, body in res.body.items():
+                        record.bodies.append(body)
+                        if response_type != "application/json":
+                            continue
+                        if find_rt and level == 0 and record.rt is None:
+                            # the first example with an rt
+                            if body.example is not None:
+                                record.rt = self.get_resource_type_line(body.example)
+                            if record.rt is None:
+                                print "get_resource_type_by_resources ERROR: no RT found in:", body.example
+                        if method == self.table_method and res_name == 200:
+                            # we only want the succesfull case
+                            text = self.get_schema_string_from_body(body)
+                            if text is not None:
+                                record.table_schemas.append(text)
+
+        if obj.resources is not None:
+            for n_res_name, n_obj in obj.resources.items():
+                self.visit_resource(records, level + 1, n_res_name, n_obj)
 
     def list_x_resource(self, level, resource, obj, select_resource=None):
         """
@@ -863,10 +2703,9 @@ class CreateDoc(object):
         :param resourceName:
         :return:
         """
-        for resource, obj in parse_tree.resources.items():
-            # ignore the start slash
-            if resource[1:] == resource_name:
-                return obj.displayName
+        for record in self.visit_resources(parse_tree, resource_name):
+            if record.level == 0 and resource_name is not None:
+                return record.display_name
 
     def get_resource_type_line(self, input_lines):
         """
@@ -890,19 +2729,9 @@ class CreateDoc(object):
         :param resource_name:
         :return: resource type of the resource name
         """
-        for resource, obj in parse_tree.resources.items():
-            if resource[1:] == resource_name:
-                for method, mobj in obj.methods.items():
-                    if mobj.responses is not None:
-                        for resName, res in mobj.responses.items():
-                            if res.body is not None:
-                                for sName, _body in res.body.items():
-                                    if sName == "application/json":
-                                        value = self.get_resource_type_line(_body.example)
-                                        if value is not None:
-                                            return value
-                                        else:
-                                             print "get_resource_type_by_resources ERROR: no RT found in:", _body.example
+        for record in self.visit_resources(parse_tree, resource_name):
+            if record.level == 0 and resource_name is not None:
+                return record.rt
         return None
 
     def parse_schema_requires(self, input_string_schema):
@@ -949,16 +2778,16 @@ class CreateDoc(object):
                     type += ": see schema"
                 if type == "object":
                     type += ": see schema"
-                row_cells = self.tableAttribute.add_row().cells
-                row_cells[0].text = str(prop)+ postfix
-                row_cells[1].text = str(type)
+                row_cells = self.tableAttribute.add_row()
+                row_cells[0] = str(prop)+ postfix
+                row_cells[1] = str(type)
                 if str(prop) in required_props:
-                    row_cells[2].text = "yes"
+                    row_cells[2] = "yes"
                 if read_only is not None and read_only is True:
-                    row_cells[3].text = "Read Only"
+                    row_cells[3] = "Read Only"
                 if read_only is not None and read_only is False:
-                    row_cells[3].text = "Read Write"
-                row_cells[4].text = description_text
+                    row_cells[3] = "Read Write"
+                row_cells[4] = description_text
 
         except:
             traceback.print_exc()
@@ -967,40 +2796,38 @@ class CreateDoc(object):
 
     def parse_schema(self, input_string_schema):
         """
-
+        fill the property table with the (merged, see MergedProperties) properties of the schema
         :param input_string_schema:
         """
         required_props = self.parse_schema_requires(input_string_schema)
         print "parse_schema: required properties found:", required_props
-        json_dict =json.loads(input_string_schema)
+        view = self.merged_properties(input_string_schema)
+        required = required_props + [name for name in view.required if name not in required_props]
 
-        properties = find_key_link(json_dict, 'properties')
-        if properties is not None:
-            for prop in properties:
-                # fill the table
-                self.fill_properties_table(properties, prop, required_props)
-                type = properties[prop].get('type')
-                if type in ["array", "object"]:
-                    print ("array/object found:", prop)
-                    array_properties = find_key_link(properties[prop], 'properties')
-                    if array_properties is not None:
-                        postfix = "\n("+prop+")"
-                        for a_prop in array_properties:
-                            self.fill_properties_table(array_properties, a_prop, required_props, postfix =postfix)
+        for prop in view.names:
+            # fill the table
+            self.fill_properties_table(view.schemas, prop, required)
+            type = view.schemas[prop].get('type')
+            if type in ["array", "object"]:
+                print ("array/object found:", prop)
+                nested = view.nested(prop)
+                if nested is not None:
+                    postfix = "\n("+prop+")"
+                    nested_required = required_props + [name for name in nested.required if name not in required_props]
+                    for a_prop in nested.names:
+                        self.fill_properties_table(nested.schemas, a_prop, nested_required, postfix =postfix)
 
     def parse_schema_derived(self, input_string_schema):
         """
-
+        fill the derived property table with the (merged, see MergedProperties) properties of the schema
         :param input_string_schema:
         """
         required_props = self.parse_schema_requires(input_string_schema)
         print "parse_schema_derived: required properties found:", required_props
-        json_dict =json.loads(input_string_schema)
-        clean_dict(json_dict)
-
-        properties = find_key_link(json_dict, 'properties')
+        view = self.merged_properties(input_string_schema)
+        properties = view.schemas
 
-        for prop in properties:
+        for prop in view.names:
             # fill the table
             try:
                 if isinstance(properties, dict):
@@ -1013,50 +2840,35 @@ class CreateDoc(object):
                         to_ocf = my_dict.get('x-to-ocf',"")
                         from_ocf = my_dict.get('x-from-ocf',"")
 
-                    row_cells = self.tableAttribute.add_row().cells
-                    row_cells[0].text = str(prop)
-                    row_cells[1].text = str(ocf_resource)
-                    row_cells[2].text = self.list_to_string(to_ocf)
-                    row_cells[3].text = self.list_to_string(from_ocf)
-                    row_cells[4].text = description_text
+                    row_cells = self.tableAttribute.add_row()
+                    row_cells[0] = str(prop)
+                    row_cells[1] = str(ocf_resource)
+                    row_cells[2] = self.list_to_string(to_ocf)
+                    row_cells[3] = self.list_to_string(from_ocf)
+                    row_cells[4] = description_text
 
             except:
                 traceback.print_exc()
                 pass
 
 
-    def list_attribute(self, level, resource, obj, derived=False):
+    def list_attribute(self, record, derived=False):
         """
         list all attributes of an indicated resource
         e.g. put it in the table
-        :param level:
-        :param resource:
-        :param obj:
+        :param record: ResourceRecord
+        :param derived: use the derived table (only for the top level resource, as before)
         :return:
         """
-        if obj is None:
+        if record.obj is None:
             print "EMPTY EMPTY"
             return
 
-        if level != 0:
-            if obj.methods is not None:
-                for method, mobj in obj.methods.items():
-                    # default method get...
-                    if method == self.table_method:
-                        for res_name, res in mobj.responses.items():
-                            if res_name == 200:
-                                # we only want the succesfull case
-                                for response_type, body in res.body.items():
-                                    if response_type == "application/json":
-                                        text = self.get_schema_string_from_body(body)
-                                        if text is not None:
-                                            if derived is False:
-                                                self.parse_schema(text)
-                                            else:
-                                                self.parse_schema_derived(text)
-
-        for res_name, res_obj in obj.resources.items():
-            self.list_attribute(level + 1, res_name, res_obj)
+        for text in record.table_schemas:
+            if derived is False or record.level != 0:
+                self.parse_schema(text)
+            else:
+                self.parse_schema_derived(text)
 
     def list_attributes(self, parse_tree, select_resource=None):
         """
@@ -1065,32 +2877,19 @@ class CreateDoc(object):
         :param parse_tree:
         :param select_resource:
         """
-        self.tableAttribute = self.document.add_table(rows=1, cols=5, style='TABLE-A')
-        hdr_cells = self.tableAttribute.rows[0].cells
-        hdr_cells[0].text = 'Property name'
-        hdr_cells[1].text = 'Value type'
-        hdr_cells[2].text = 'Mandatory'
-        hdr_cells[3].text = 'Access mode'
-        hdr_cells[4].text = 'Description'
+        self.tableAttribute = TableBuilder(PROPERTY_TABLE_HEADER, self.styles['TABLE-A'])
 
-        level = 1
-
-        if select_resource is None:
-            for resource, obj in parse_tree.resources.items():
-                self.list_attribute(level, resource, obj)
-        else:
-            for resource, obj in parse_tree.resources.items():
-                if resource[1:] == select_resource:
-                    self.list_attribute(level, resource, obj)
+        for record in self.visit_resources(parse_tree, select_resource):
+            self.list_attribute(record)
 
         if self.sensor_switch is True:
             # auto generate the sensor value data..
-            row_cells = self.tableAttribute.add_row().cells
-            row_cells[0].text = "value"
-            row_cells[1].text = "boolean"
-            row_cells[2].text = "yes"
-            row_cells[3].text = "Read Only"
-            row_cells[4].text = "True = Sensed, False = Not Sensed."
+            row_cells = self.tableAttribute.add_row()
+            row_cells[0] = "value"
+            row_cells[1] = "boolean"
+            row_cells[2] = "yes"
+            row_cells[3] = "Read Only"
+            row_cells[4] = "True = Sensed, False = Not Sensed."
 
         if self.schema_switch is True:
             # add values from external schema.
@@ -1100,6 +2899,7 @@ class CreateDoc(object):
                 linestring = open(full_path, 'r').read()
                 # add fields in table with contents..
                 self.parse_schema(linestring)
+        self.tableAttribute.add_to(self.document)
 
     def list_attributes_derived(self, parse_tree, select_resource=None):
 
@@ -1109,23 +2909,12 @@ class CreateDoc(object):
         :param parse_tree:
         :param select_resource:
         """
-        self.tableAttribute = self.document.add_table(rows=1, cols=5, style='TABLE-A')
-        hdr_cells = self.tableAttribute.rows[0].cells
-        hdr_cells[0].text = str(self.derived_name) +' Property name'
-        hdr_cells[1].text = 'OCF Resource'
-        hdr_cells[2].text = 'To OCF'
-        hdr_cells[3].text = 'From OCF'
-        hdr_cells[4].text = 'Description'
+        self.tableAttribute = TableBuilder([str(self.derived_name) +' Property name', 'OCF Resource',
+                                            'To OCF', 'From OCF', 'Description'],
+                                           self.styles['TABLE-A'])
 
-        level = 1
-
-        if select_resource is None:
-            for resource, obj in parse_tree.resources.items():
-                self.list_attribute(level, resource, obj, derived=True)
-        else:
-            for resource, obj in parse_tree.resources.items():
-                if resource[1:] == select_resource:
-                    self.list_attribute(level, resource, obj, derived=True)
+        for record in self.visit_resources(parse_tree, select_resource):
+            self.list_attribute(record, derived=True)
 
 
         if self.schema_switch is True:
@@ -1134,6 +2923,7 @@ class CreateDoc(object):
                 linestring = open(schema_file, 'r').read()
                 # add fields in table with contents..
                 self.parse_schema(linestring)
+        self.tableAttribute.add_to(self.document)
 
     def remove_eof_smart(self, input_string):
         """
@@ -1143,12 +2933,7 @@ class CreateDoc(object):
         :param input_string: string
         :return: string without EOL chars
         """
-        ret_string = ""
-        lines = input_string.splitlines()
-        for line in lines:
-            # add behind the added line an space
-            ret_string = ret_string + line + " "
-        return ret_string
+        return textlayout.remove_eol(input_string)
 
     def add_justification_smart(self, depth, input_string, no_dot_split=False):
 
@@ -1159,19 +2944,7 @@ class CreateDoc(object):
         :param input_string: string to be adjusted
         :return:  adjusted string
         """
-        ret_string = ""
-        all_lines = input_string.splitlines()
-        for x_line in all_lines:
-            if no_dot_split is False:
-                lines = x_line.split(". ")
-                for line in lines:
-                    string1 = depth + line + "\n"
-                    if len(line) > 0:
-                        ret_string = ret_string + string1
-            else:
-                string1 = depth + x_line + "\n"
-                ret_string = ret_string + string1
-        return ret_string
+        return textlayout.justify_smart(depth, input_string, no_dot_split=no_dot_split)
 
     def add_justification(self, depth, input_string):
         """
@@ -1181,12 +2954,7 @@ class CreateDoc(object):
         :param input_string: string to be adjusted
         :return: adjusted string
         """
-        ret_string = ""
-        lines = input_string.splitlines()
-        for line in lines:
-            string1 = depth + line + "\n"
-            ret_string = ret_string + string1
-        return ret_string
+        return textlayout.justify(depth, input_string)
 
     def print_bodies(self, depth, bodies):
         """
@@ -1206,9 +2974,9 @@ class CreateDoc(object):
         :param body: object
         """
         tdepth = depth + self.tab
-        self.document.add_paragraph(depth + "body:", style='CODE-AQUA')
+        self.code.add(depth + "body:", self.styles['CODE-AQUA'])
         post_txt = tdepth + "application/json" + ":"
-        self.document.add_paragraph(post_txt, style='CODE-AQUA')
+        self.code.add(post_txt, self.styles['CODE-AQUA'])
         self.print_body(tdepth, b_name, body)
 
     def validate_with_json_lint(self, schema_filename, json_file, json_string):
@@ -1231,67 +2999,140 @@ class CreateDoc(object):
         print "==> validate_with_json_lint: validation complete"
 
     def validate_body(self, body):
-        schema_string = ""
-        try:
-            # validation by using package:
-            # https://pypi.python.org/pypi/jsonschema
-            print "xx=> validation schema (jsonschema)"
-            schema_string = self.get_schema_string_from_body(body)
+        """
+        validate the example of the body against the schema of the body and print the report
+        the result is taken from the batch validation (see validate_examples), that is run at the
+        first validated body.
 
-            v_schema = None
-            v_example = None
-            try:
-                v_schema = json.loads(schema_string)
-            except ValueError as ex:
-                print "error with loading schema:"
-                print ex
-            try:
-                v_example = json.loads(body.example)
-            except ValueError as ex:
-                print "error with loading example:"
-                print ex
-
-            # Lazily report all errors in the instance
-            validation_error = False
-            v = None
+        :param body: body object (with schema and example)
+        :return: True if the example is valid
+        """
+        if self.validation_source is not None:
+            parse_tree, select_resource = self.validation_source
+            self.validation_source = None
+            self.validate_examples(parse_tree, select_resource)
+        print "xx=> validation schema (jsonschema)"
+        schema_string = self.get_schema_string_from_body(body)
+        result = self.validation_result(schema_string, body.example)
+        if result is None:
+            result = validate_example(schema_string, body.example, self.max_errors)
+        valid, lines = result
+        for line in lines:
+            print line
+        print "xxx=> validation schema (jsonschema) done"
+        return valid
+
+    def validation_result(self, schema_string, example):
+        """
+        result of the batch validation for an example
+        the results come in the order of the examples (the order of the bodies),
+        they are taken until the result of this example is found.
+
+        :param schema_string: json text of the schema
+        :param example: json text of the example
+        :return: tuple (valid, list of report lines), None if the example is not validated in the batch
+        """
+        key = (schema_string, example)
+        while key not in self.validation_results and self.pending_validations:
+            next_key, results = self.pending_validations.popleft()
             try:
-                v = Draft4Validator(v_schema)
-                for error in sorted(v.iter_errors(v_example), key=str):
-                    validation_error = True
-                    print(error.message)
-                    print(error)
+                self.validation_results[next_key] = results.next()
+            except Exception as e:
+                print "validation_result: batch validation failed, validating serially:", e
+        return self.validation_results.get(key)
 
-            except ValidationError as e:
-                validation_error = True
-                print "validation failed:"
-                print (e.message)
-
-                for error in sorted(v.iter_errors(v_example), key=str):
-                    validation_error = True
-                    print(error.message)
-                    print(error)
-
-            if validation_error is True:
-                print "validation failed, input information:"
-                print "body (json):"
-                print body.example
-                print ""
-                print "schema (json):"
-                print schema_string
-            else:
-                print "xx=xx=> schema & json VALID"
-                # validate (v_example, v_schema, cls=Draft4Validator)
+    def list_example_bodies(self, parse_tree, select_resource=None):
+        """
+        list the bodies with an schema and an example, in the order of the RAML definition section
+        bodies with the same schema and example are listed once.
+
+        :param parse_tree: tree to walk
+        :param select_resource: only the selected resource (name without leading /)
+        :return: list of tuples (schema string, example)
+        """
+        examples = []
+        seen = set()
+        for record in self.visit_resources(parse_tree, select_resource):
+            for body in record.bodies:
+                if body.schema is None or body.example is None:
+                    continue
+                key = (self.get_schema_string_from_body(body, report=False), body.example)
+                if key not in seen:
+                    seen.add(key)
+                    examples.append(key)
+        return examples
+
+    def start_validation(self, parse_tree, select_resource=None):
+        """
+        validate the examples of the parse tree in one batch (see validate_examples),
+        started at the first validated body, after the resources are walked,
+        so that the output does not depend on the number of jobs.
+
+        :param parse_tree: tree to walk
+        :param select_resource: only the selected resource (name without leading /)
+        """
+        self.pending_validations = None
+        self.validation_results = {}
+        self.validation_source = (parse_tree, select_resource)
+
+    def validate_examples(self, parse_tree, select_resource=None):
+        """
+        validate all examples of the parse tree against their schema, in one pass
+        with validate_jobs > 1 in an process pool, while the word document is generated,
+        otherwise in this process. the reports are printed per body by validate_body.
+
+        :param parse_tree: tree to walk
+        :param select_resource: only the selected resource (name without leading /)
+        :return: number of examples
+        """
+        examples = self.list_example_bodies(parse_tree, select_resource)
+        tasks = [(schema_string, example, self.max_errors) for schema_string, example in examples]
+        results = None
+        if self.validate_jobs > 1 and len(tasks) > 1:
+            results = self.start_validation_pool(tasks)
+        if results is None:
+            results = itertools.imap(validate_example_task, tasks)
+        # one shared iterator, the results are in the order of the examples
+        self.pending_validations = deque((key, results) for key in examples)
+        self.validation_results = {}
+        return len(examples)
+
+    def start_validation_pool(self, tasks):
+        """
+        start the validation pool, see validate_examples
+
+        :param tasks: list of arguments of validate_example_task
+        :return: iterator over the results, in the order of the tasks. None if the pool could not be started
+        """
+        try:
+            schema_dirs = None
+            recursive = False
+            if self.validators.schema_store is not None:
+                schema_dirs = self.validators.schema_store.schema_directory.schema_dirs
+                recursive = self.validators.schema_store.schema_directory.recursive
+            self.validation_pool = multiprocessing.Pool(min(self.validate_jobs, len(tasks)),
+                                                        init_validation_worker,
+                                                        (schema_dirs, recursive, self.validators.use_network))
+            results = self.validation_pool.imap(validate_example_task, tasks)
+            self.validation_pool.close()
+            return results
         except Exception as e:
-            print 'schema error:', e
-            print ""
-            print "ERROR: failure in body (json):"
-            print body.example
-            print ""
-            print "schema (json):"
-            print schema_string
-            print ""
+            print "start_validation: could not start the validation pool, validating serially:", e
+            if self.validation_pool is not None:
+                self.validation_pool.terminate()
+                self.validation_pool = None
+            return None
 
-        print "xxx=> validation schema (jsonschema) done"
+    def finish_validation(self):
+        """
+        stop the validation pool, if started
+        """
+        if self.validation_pool is not None:
+            self.validation_pool.join()
+            self.validation_pool = None
+        self.pending_validations = None
+        self.validation_results = {}
+        self.validation_source = None
 
     def print_body(self, depth, body_name, body):
         """
@@ -1311,37 +3152,34 @@ class CreateDoc(object):
             return
         if body.schema is not None:
             if body_name is not "":
-                self.document.add_paragraph(tdepth + "body:", style='CODE-AQUA')
+                self.code.add(tdepth + "body:", self.styles['CODE-AQUA'])
                 method_txt = ttdepth + body_name + ":"
-                self.document.add_paragraph(method_txt, style='CODE-AQUA')
+                self.code.add(method_txt, self.styles['CODE-AQUA'])
                 write_depth = tttdepth
 
-            p = self.document.add_paragraph(write_depth + "schema", style='CODE-GREY')
-            p.add_run(": |", style='CODE_GREY_C')
+            p = self.code.add(write_depth + "schema", self.styles['CODE-GREY'])
+            p.add_run(": |", style=self.styles['CODE_GREY_C'])
             # schema itself
             schema_text = self.get_schema_string_from_body(body)
             try:
                 schema_text = str(schema_text)
-                par = self.document.add_paragraph(self.add_justification(write_depth + self.tab, schema_text),
-                                                  style='CODE-BLACK')
-                par.alignment = WD_ALIGN_PARAGRAPH.LEFT
+                self.code.add(self.add_justification(write_depth + self.tab, schema_text), self.styles['CODE-BLACK'],
+                              alignment=WD_ALIGN_PARAGRAPH.LEFT)
             except:
                 print "failure in (schema):", schema_text
 
         if body.example is not None:
             try:
                 # this is a simple check if the json is correctly formatted.
-                json_data = json.loads(body.example)
-                clean_dict(json_data)
+                json_data = self.registry.parse(body.example)
             except:
                 print "failure in (json):", body.example
 
             try:
-                p = self.document.add_paragraph(write_depth + "example", style='CODE-GREY')
-                p.add_run(": |", style='CODE_GREY_C')
-                par = self.document.add_paragraph(self.add_justification(write_depth + self.tab, body.example),
-                                                  style='CODE-BLACK')
-                par.alignment = WD_ALIGN_PARAGRAPH.LEFT
+                p = self.code.add(write_depth + "example", self.styles['CODE-GREY'])
+                p.add_run(": |", style=self.styles['CODE_GREY_C'])
+                self.code.add(self.add_justification(write_depth + self.tab, body.example), self.styles['CODE-BLACK'],
+                              alignment=WD_ALIGN_PARAGRAPH.LEFT)
             except:
                 print "failure in (body example):", body.example
 
@@ -1389,19 +3227,19 @@ class CreateDoc(object):
 
         for resName, res in response.items():
             if resName is not None:
-                self.document.add_paragraph(tdepth + str(resName) + ":", style='CODE-BLUE')
+                self.code.add(tdepth + str(resName) + ":", self.styles['CODE-BLUE'])
             if res.description is not None:
                 self.print_description(ttdepth, res.description)
             if res.schema is not None:
-                p = self.document.add_paragraph(ttdepth + "schema ", style='CODE-AQUA')
-                p.add_run(": |", style='CODE_YELLOW_C')
-                par = self.document.add_paragraph(self.add_justification(tttdepth, res.schema), style='CODE-BLACK')
-                par.alignment = WD_ALIGN_PARAGRAPH.LEFT
+                p = self.code.add(ttdepth + "schema ", self.styles['CODE-AQUA'])
+                p.add_run(": |", style=self.styles['CODE_YELLOW_C'])
+                self.code.add(self.add_justification(tttdepth, res.schema), self.styles['CODE-BLACK'],
+                              alignment=WD_ALIGN_PARAGRAPH.LEFT)
             if res.example is not None:
-                p = self.document.add_paragraph(ttdepth + "example", style='CODE-AQUA')
-                p.add_run(": |", style='CODE_YELLOW_C')
-                par = self.document.add_paragraph(self.add_justification(tttdepth, res.example), style='CODE-BLACK')
-                par.alignment = WD_ALIGN_PARAGRAPH.LEFT
+                p = self.code.add(ttdepth + "example", self.styles['CODE-AQUA'])
+                p.add_run(": |", style=self.styles['CODE_YELLOW_C'])
+                self.code.add(self.add_justification(tttdepth, res.example), self.styles['CODE-BLACK'],
+                              alignment=WD_ALIGN_PARAGRAPH.LEFT)
 
             self.print_header(tdepth, res.headers)
             self.print_bodies(tdepth, res.body)
@@ -1413,10 +3251,9 @@ class CreateDoc(object):
         :param description_txt: text to be put in the word document
         """
         if description_txt is not None:
-            self.document.add_paragraph(depth + "description: |", style='CODE-YELLOW')
+            self.code.add(depth + "description: |", self.styles['CODE-YELLOW'])
             adjusted_text = self.add_justification_smart(depth + self.tab, description_txt)
-            par = self.document.add_paragraph(adjusted_text, style='CODE-YELLOW')
-            par.italic = True
+            self.code.add(adjusted_text, self.styles['CODE-YELLOW'])
 
     def list_to_array(self, input_list):
         """
@@ -1424,14 +3261,7 @@ class CreateDoc(object):
         :param input_list: python array
         :return: string as raml string representation. example = "[ 'blah', 'blah2' ]"
         """
-        my_string = "["
-        for x in input_list:
-            comma = ", "
-            my_string = my_string + '"' + x + '"' + comma
-        # remove last comman (e.g. last 2 chars)
-        my_string = my_string[:-2]
-        my_string += "]"
-        return my_string
+        return textlayout.list_to_array(input_list)
 
     def list_to_string(self, input_list):
         """
@@ -1440,10 +3270,7 @@ class CreateDoc(object):
         :param input_list: python array ["aa", "bb"
         :return: string example "aabb"
         """
-        my_string = ""
-        for x in input_list:
-            my_string = my_string + x
-        return my_string
+        return textlayout.list_to_string(input_list)
 
     def print_trait_query_parameters(self, depth, query_parameters):
         """
@@ -1454,10 +3281,10 @@ class CreateDoc(object):
         tdepth = depth + self.tab
         ttdepth = tdepth + self.tab
         if query_parameters is not None:
-            self.document.add_paragraph(depth + "queryParameters: ", style='CODE-AQUA')
+            self.code.add(depth + "queryParameters: ", self.styles['CODE-AQUA'])
             for query_name, query_obj in query_parameters.items():
                 qtext = tdepth + query_name + ":"
-                self.document.add_paragraph(qtext, style='CODE-BLUE')
+                self.code.add(qtext, self.styles['CODE-BLUE'])
                 for name, q_obj in query_obj.items():
                     nametext = ""
                     if name == "enum":
@@ -1466,7 +3293,7 @@ class CreateDoc(object):
                     else:
                         # list as an string
                         nametext = nametext + ttdepth + name + ": " + self.list_to_string(q_obj)
-                    self.document.add_paragraph(nametext, style='CODE-BLUE')
+                    self.code.add(nametext, self.styles['CODE-BLUE'])
 
     def print_query_parameters(self, depth, query_params):
         """
@@ -1478,28 +3305,28 @@ class CreateDoc(object):
         tdepth = depth + self.tab
         ttdepth = tdepth + self.tab
         if query_params is not None:
-            self.document.add_paragraph(depth + "queryParameters: ", style='CODE-AQUA')
+            self.code.add(depth + "queryParameters: ", self.styles['CODE-AQUA'])
             for query_name, qobj in query_params.items():
                 name_text = tdepth + query_name + ":"
-                self.document.add_paragraph(name_text, style='CODE-BLUE')
+                self.code.add(name_text, self.styles['CODE-BLUE'])
                 if qobj.enum is not None:
                     name_text = ttdepth + "enum: " + self.list_to_string(qobj.enum)
-                    self.document.add_paragraph(name_text, style='CODE-BLUE')
+                    self.code.add(name_text, self.styles['CODE-BLUE'])
                 if qobj.type is not None:
                     name_text = ttdepth + "type: " + self.list_to_string(qobj.type)
-                    self.document.add_paragraph(name_text, style='CODE-BLUE')
+                    self.code.add(name_text, self.styles['CODE-BLUE'])
                 if qobj.description is not None:
                     name_text = ttdepth + "description: " + self.list_to_string(qobj.description)
-                    self.document.add_paragraph(name_text, style='CODE-YELLOW')
+                    self.code.add(name_text, self.styles['CODE-YELLOW'])
                 if qobj.required is not None:
                     if qobj.required is True:
                         name_text = ttdepth + "required: true"
                     else:
                         name_text = ttdepth + "required: false"
-                    self.document.add_paragraph(name_text, style='CODE-BLUE')
+                    self.code.add(name_text, self.styles['CODE-BLUE'])
                 if qobj.example is not None:
                     name_text = ttdepth + "example: " + self.list_to_string(qobj.example)
-                    self.document.add_paragraph(name_text, style='CODE-GREY')
+                    self.code.add(name_text, self.styles['CODE-GREY'])
 
     def printIS_(self, depth, is_):
         # print the is string in the RAML definition.. this on resource level
@@ -1510,7 +3337,7 @@ class CreateDoc(object):
                 my_string += my_temp
             my_string = my_string[:-1]
             my_string += "]"
-            self.document.add_paragraph(my_string, style='CODE-BLUE')
+            self.code.add(my_string, self.styles['CODE-BLUE'])
 
     def print_resource(self, depth, pr_resource, obj):
         """
@@ -1528,7 +3355,7 @@ class CreateDoc(object):
             return
 
         resource_text = depth + pr_resource + ":"
-        self.document.add_paragraph(resource_text, style='CODE-BLUE')
+        self.code.add(resource_text, self.styles['CODE-BLUE'])
         try:
             if obj.description is not None:
                 self.print_description(tdepth, obj.description)
@@ -1544,7 +3371,7 @@ class CreateDoc(object):
             for method, mobj in obj.methods.items():
                 # RamlMethod
                 method_txt = tdepth + method + ":"
-                self.document.add_paragraph(method_txt, style='CODE-AQUA')
+                self.code.add(method_txt, self.styles['CODE-AQUA'])
                 # description on method level
                 if mobj.description is not None:
                     self.print_description(ttdepth, mobj.description)
@@ -1558,7 +3385,7 @@ class CreateDoc(object):
                 if mobj.body is not None:
                     self.print_post_put_body(ttdepth, "", mobj.body)
                 # print the response header of the method
-                self.document.add_paragraph(ttdepth + "responses :", style='CODE-AQUA')
+                self.code.add(ttdepth + "responses :", self.styles['CODE-AQUA'])
                 # print the different responses
                 self.print_response(ttdepth, mobj.responses)
             # recurse...
@@ -1576,7 +3403,7 @@ class CreateDoc(object):
         # one extra, due to array item indicator -
         ttdepth = "   " + self.tab
         trait_string = " - " + trait_name + " :"
-        self.document.add_paragraph(trait_string, style='CODE-AQUA')
+        self.code.add(trait_string, self.styles['CODE-AQUA'])
         self.print_trait_query_parameters(ttdepth, obj.queryParameters)
 
     def print_traits(self, depth, parse_tree):
@@ -1589,7 +3416,7 @@ class CreateDoc(object):
         # function to loop over the bodies in an method
         try:
             if len(traits.items()) > 0:
-                self.document.add_paragraph("traits:", style='CODE-AQUA')
+                self.code.add("traits:", self.styles['CODE-AQUA'])
             # todo first trait needs a - to indicate it is an array...
             for trait_name, obj in traits.items():
                 self.print_trait(self.tab, trait_name, obj)
@@ -1617,19 +3444,20 @@ class CreateDoc(object):
         print "Title", title_name
         self.title = title_name
 
-        if self.rt_provided_name is None:
-            print "RT = ", self.get_resource_type_by_resources(parse_tree, section_name)
+        if self.rt_provided_name is not None:
+            rt_name = self.rt_provided_name
         else:
-            print "RT = ", self.rt_provided_name
+            rt_name = self.get_resource_type_by_resources(parse_tree, section_name)
+        print "RT = ", rt_name
 
         # section Resource name
         par = self.document.add_heading(title_name, level=2)
         if self.annex_switch is True:
-            par.style = 'ANNEX-heading1'
+            par.style = self.styles['ANNEX-heading1']
         # section introduction
         par = self.document.add_heading('Introduction', level=3)
         if self.annex_switch is True:
-            par.style = 'ANNEX-heading2'
+            par.style = self.styles['ANNEX-heading2']
         self.list_descriptions(parse_tree, select_resource=section_name)
 
         # section URI
@@ -1639,7 +3467,7 @@ class CreateDoc(object):
             par = self.document.add_heading('Wellknown URI', level=3)
 
         if self.annex_switch is True:
-            par.style = 'ANNEX-heading2'
+            par.style = self.styles['ANNEX-heading2']
 
         if self.fixed_uri is None:
             self.list_URIs(parse_tree, select_resource=section_name)
@@ -1650,12 +3478,7 @@ class CreateDoc(object):
         # section RT
         par = self.document.add_heading('Resource Type', level=3)
         if self.annex_switch is True:
-            par.style = 'ANNEX-heading2'
-
-        if self.rt_provided_name is not None:
-            rt_name = self.rt_provided_name
-        else:
-            rt_name = self.get_resource_type_by_resources(parse_tree, section_name)
+            par.style = self.styles['ANNEX-heading2']
 
         if rt_name is not None:
             text = "The resource type (rt) is defined as: " + rt_name + "."
@@ -1666,32 +3489,31 @@ class CreateDoc(object):
         # section RAML definition
         par = self.document.add_heading('RAML Definition', level=3)
         if self.annex_switch is True:
-            par.style = 'ANNEX-heading2'
+            par.style = self.styles['ANNEX-heading2']
 
         # self.document.add_section()
-        self.document.add_paragraph("#%RAML 0.8", style='CODE-GREEN')
-        p = self.document.add_paragraph("title: ", style='CODE-YELLOW')
-        p.add_run(parse_tree.title).italic = True
-        p = self.document.add_paragraph("version: ", style='CODE-YELLOW')
+        self.code = CodeBlock(self.document)
+        self.code.add("#%RAML 0.8", self.styles['CODE-GREEN'])
+        p = self.code.add("title: ", self.styles['CODE-YELLOW'])
+        p.add_run(parse_tree.title, italic=True)
+        p = self.code.add("version: ", self.styles['CODE-YELLOW'])
         version_text = str(parse_tree.version)
-        p.add_run(version_text).italic = True
+        p.add_run(version_text, italic=True)
 
         self.print_traits("", parse_tree)
 
-        self.document.add_paragraph("")
-        for resource, obj in parse_tree.resources.items():
-            if section_name is None:
-                self.print_resource("", resource, obj)
-            else:
-                if section_name == resource[1:]:
-                    self.print_resource("", resource, obj)
+        self.code.add("", None)
+        for record in self.visit_resources(parse_tree, section_name):
+            if record.level == 0:
+                self.print_resource("", record.name, record.obj)
+        self.code.write()
 
         if self.composite_switch is False:
             # do not add when the switch is true...
             # section property definition
             par = self.document.add_heading('Property Definition', level=3)
             if self.annex_switch is True:
-                par.style = 'ANNEX-heading2'
+                par.style = self.styles['ANNEX-heading2']
             if self.derived_name is not None:
                 self.list_attributes_derived(parse_tree, select_resource=section_name)
             else:
@@ -1700,24 +3522,24 @@ class CreateDoc(object):
         # section CRUDN definition
         par = self.document.add_heading('CRUDN behavior', level=3)
         if self.annex_switch is True:
-            par.style = 'ANNEX-heading2'
+            par.style = self.styles['ANNEX-heading2']
         self.list_resources_crudn(parse_tree, select_resource=section_name)
 
         if self.schema_switch is True:
             # section extra JSON definition
             par = self.document.add_heading('Referenced JSON schemas', level=3)
             if self.annex_switch is True:
-                par.style = 'ANNEX-heading2'
+                par.style = self.styles['ANNEX-heading2']
 
             for my_schema_file in self.schema_files:
                 par = self.document.add_heading(my_schema_file, level=4)
                 if self.annex_switch is True:
-                    par.style = 'ANNEX-heading2'
+                    par.style = self.styles['ANNEX-heading2']
                 schema_dir = args['schemadir']
                 full_path = os.path.join(schema_dir, my_schema_file)
                 schema_text = open(full_path, 'r').read()
                 try:
-                    par = self.document.add_paragraph(self.add_justification("", schema_text), style='CODE-BLACK')
+                    par = self.document.add_paragraph(self.add_justification("", schema_text), style=self.styles['CODE-BLACK'])
                     par.alignment = WD_ALIGN_PARAGRAPH.LEFT
                 except:
                     pass
@@ -1726,57 +3548,47 @@ class CreateDoc(object):
             # section extra JSON definition
             par = self.document.add_heading('Referenced JSON schemas', level=3)
             if self.annex_switch is True:
-                par.style = 'ANNEX-heading2'
+                par.style = self.styles['ANNEX-heading2']
 
             for schema_file in self.schemaWT_files:
                 par = self.document.add_heading(schema_file, level=4)
                 if self.annex_switch is True:
-                    par.style = 'ANNEX-heading2'
+                    par.style = self.styles['ANNEX-heading2']
 
                 par = self.document.add_heading("Property Definition", level=5)
                 if self.annex_switch is True:
-                    par.style = 'ANNEX-heading2'
+                    par.style = self.styles['ANNEX-heading2']
 
                 schema_text = open(schema_file, 'r').read()
 
-                self.tableAttribute = self.document.add_table(rows=1, cols=5, style='TABLE-A')
-
-                hdr_cells = self.tableAttribute.rows[0].cells
-                hdr_cells[0].text = 'Property name'
-                hdr_cells[1].text = 'Value type'
-                hdr_cells[2].text = 'Mandatory'
-                hdr_cells[3].text = 'Access mode'
-                hdr_cells[4].text = 'Description'
+                self.tableAttribute = TableBuilder(PROPERTY_TABLE_HEADER, self.styles['TABLE-A'])
 
                 # add fields in table with contents..
                 self.parse_schema(schema_text)
+                self.tableAttribute.add_to(self.document)
                 par = self.document.add_heading("Schema Definition", level=5)
                 if self.annex_switch is True:
-                    par.style = 'ANNEX-heading2'
+                    par.style = self.styles['ANNEX-heading2']
                 try:
-                    par = self.document.add_paragraph(self.add_justification("", schema_text), style='CODE-BLACK')
+                    par = self.document.add_paragraph(self.add_justification("", schema_text), style=self.styles['CODE-BLACK'])
                     par.alignment = WD_ALIGN_PARAGRAPH.LEFT
                 except:
                     pass
 
     def schemaRef2Filename(self, schema_name):
         # convert the schema reference name into the actual filename to be read
-        schemas = self.parsetree.schemas
-        try:
-            for item in schemas:
-                for name, obj in item.items():
-                    if name == schema_name:
-                        return obj.file_name
-        except:
-            pass
+        entry = self.schema_table.get(schema_name)
+        if entry is not None and entry.file_name is not None:
+            return entry.file_name
         return "ERROR-IN-RESOLVING-SCHEMA:NO_FILE_FOUND_FOR:" + str(schema_name)
 
-    def get_schema_string_from_body(self, body):
+    def get_schema_string_from_body(self, body, report=True):
         """
         convert the schema reference name into the actual filename to be read
         will determine if the referenced file needs to be read..
 
         :param body:
+        :param report: print the resolved reference
         :return:
         """
         schema_string = None
@@ -1785,11 +3597,18 @@ class CreateDoc(object):
         except:
             pass
         if schema_string is not None:
+            entry = self.schema_table.get(schema_string)
+            if entry is not None:
+                # reference to an schema of the schemas section, read when the RAML file was loaded
+                if report is True:
+                    print "resolve schema reference:", schema_string, entry.file_name
+                return entry.text
             if "{" not in schema_string:
                 # we think this is a reference.
                 # find it and include it.
                 filename = self.schemaRef2Filename(schema_string)
-                print "resolve schema reference:", schema_string, filename
+                if report is True:
+                    print "resolve schema reference:", schema_string, filename
                 # read the file as a string
                 try:
                     schema_string = self.read_file(filename)
@@ -1801,575 +3620,428 @@ class CreateDoc(object):
     def read_file(self, filename):
         """
         read the file as a string
+        the file is found with the schema directory index (see SchemaDirectory),
+        the file is only read once (see SchemaRegistry), next calls return the text read before.
 
         :param filename: file to read
         :return:
         """
-        try:
-            linestring = open(filename, 'r').read()
-            # create the table with contents..
-            return linestring
-        except:
-            pass
-        try:
-            full_path = os.path.join(self.dir, filename)
-            linestring = open(full_path, 'r').read()
-            # create the table with contents..
-            return linestring
-        except:
-            pass
+        if self.schema_directory is None:
+            self.schema_directory = SchemaDirectory([self.dir])
+        full_path = self.schema_directory.find(filename)
+        linestring = None
+        if full_path is not None:
+            try:
+                linestring = self.registry.read(full_path)
+            except IOError:
+                pass
+
+        if linestring is None:
+            print "read_file: could not open file:", filename, full_path
+        return linestring
+
+    def load_schema_file(self, filename):
+        """
+        read and decode an schema file, used by the dereferencer for references to other files
 
+        :param filename: file to read (see read_file)
+        :return: tuple (file key, read-only schema), (None, None) if the file could not be loaded
+        """
+        schema_string = self.read_file(filename)
+        if schema_string is None:
+            return None, None
         try:
-            base = os.path.basename(filename)
-            full_path = os.path.join(self.dir, base)
-            linestring = open(full_path, 'r').read()
-            # create the table with contents..
-            return linestring
-        except:
-            pass
+            return content_hash(schema_string), self.registry.parse(schema_string)
+        except ValueError as e:
+            print "load_schema_file: invalid json:", filename, e
+            return None, None
+
+    def merged_properties(self, schema_string):
+        """
+        merged property view of an schema text, cached by content hash (see PropertyFlattener)
 
-        print "read_file: could not open file:", filename, full_path
+        :param schema_string: json text of the schema
+        :return: MergedProperties
+        """
+        return self.flattener.view(content_hash(schema_string), self.registry.parse(schema_string))
 
-    def convert(self):
+    def load_parse_tree(self):
         """
-        conversion of the raml info into the word document
+        parse the raml file, once.
+        the parse tree is shared by the docx and swagger generation
 
-        :return:
+        :return: parse tree or None when the file could not be parsed
         """
+        if self.parsetree is not None:
+            return self.parsetree
         try:
-            parsetree = ramlparser.load(self.inputname)
+            # only the selected resource is used in the document: parse the other resources lazily
+            # the swagger generation will resolve them when it needs them
+            parsetree = ramlparser.load(self.inputname, cache=self.parse_cache,
+                                        lazy=self.resource_name is not None)
         except ValidationError as e:
             print 'validation error:', e.errors
             print "could not load file: error loading file"
             traceback.print_exc()
-            return
+            return None
 
         # make it a member..
         self.parsetree = parsetree
-        self.list_x_resources(parsetree)
+        self.schema_table = SchemaTable.build(parsetree, self.read_file, self.registry)
+        return parsetree
+
+    def load_styles(self):
+        """
+        look up the styles of the loaded document (self.document), before anything is generated
+        :return: False if styles are missing in the template
+        """
+        try:
+            self.styles = DocumentStyles(self.document)
+        except KeyError as e:
+            print "template does not have all styles: ", self.resourcedoc
+            print e.args[0]
+            return False
+        return True
+
+    def convert(self):
+        """
+        conversion of the raml info into the word document
+
+        :return:
+        """
+        parsetree = self.load_parse_tree()
+        if parsetree is None:
+            return
         # print parsetree
         # output = dump(parsetree, Dumper=Dumper,default_flow_style=False)
         # output = dump(parsetree, Dumper=SafeDumper)
         # print output
 
         try:
-            self.document = Document(docx=self.resourcedoc)
+            self.document = template_cache.document(self.resourcedoc)
         except:
             print "could not load file: ", self.resourcedoc
             print "make sure that docx file exist.."
             return
+        if self.load_styles() is False:
+            return
 
-        self.generate_sections(parsetree, self.resource_name)
+        # the validation pool runs next to the generation of the document (see validate_jobs)
+        self.start_validation(parsetree, self.resource_name)
+        try:
+            self.generate_sections(parsetree, self.resource_name)
+        finally:
+            self.finish_validation()
         self.document.save(self.resource_out)
         print "document saved..", self.resource_out
 
-    def swag_sanitize_description(self, description):
-        """
-        escapes line breaks, quotes  etc
-        \n ==> new line in string.. to literal "\n"
-        "  ==> end string, escape.. to \",
-           note that if \" exist this should not be done, e.g. use of regex to find those only
-        :param description: input string
-        :return: text string
-        """
-        text = description
-        if text is not None:
-            text = description.replace("\n","\\n")
-            regex = r"[^\\]\""
-
-            matches = re.findall(regex, text)
-            for match in matches:
-                new_text = text.replace(match, match[0]+"\\\"")
-                text = new_text
-        return text
-
-    def swag_increase_indent(self):
-        """
-        increase indentiation for output
-        """
-        self.swag_indent += self.tab
-
-    def swag_decrease_indent(self):
-        """
-        decrease indentiation for output
-        """
-        length = len(self.tab)
-        total_lenght = len(self.swag_indent)
-        self.swag_indent = self.swag_indent[:total_lenght-length]
-
-    def swag_write_stringln(self, string):
-        """
-        write the string to file with end of line
-        :param string: string to be written to file with end of line
-        """
-        self.f.write(self.swag_indent + string + "\n")
-
-    def swag_write_string_raw(self, string):
-        """
-        write the string to file, no changes to string
-        :param string: string to be written to file
-        """
-        self.f.write(string)
-
-    def swag_write_string(self, string):
+    def swag_license(self):
         """
-        write the string to file, with indentation
-        :param string: string to be written to file, with indentation
+        the licence info, under tag "info"
+        :return: swagger license object
         """
-        self.f.write(self.swag_indent + string)
+        license = OrderedDict()
+        license["name"] = OCF_license_name
+        license["x-description"] = OCF_license
+        return license
 
-    def swag_openfile(self, version, title ):
+    def swag_document(self, version, title):
         """
-        open file as swagger file
+        start of the swagger document
         :param version: version of the API (e.g. not the swagger version
         :param title: title of the API
+        :return: swagger object (ordered dict), the other parts are added by swag_add_*
         """
-        self.f = open(self.swagger, "wb")
-        self.swag_indent = ""
-
-        self.swag_write_stringln("{")
-        self.swag_increase_indent()
-        self.swag_write_stringln('"swagger": "2.0",')
-        self.swag_write_stringln('"info": {')
-        self.swag_increase_indent()
-        self.swag_write_stringln('"title": "'+str(title)+'",')
-        self.swag_write_stringln('"version": "'+str(version)+'",')
-        self.swag_license()
-        self.swag_decrease_indent()
-        self.swag_write_stringln('},')
-        self.swag_write_stringln('"schemes": ["http"],')
-        self.swag_write_stringln('"consumes": ["application/json"],')
-        self.swag_write_stringln('"produces": ["application/json"],')
-
-    def swag_license(self):
+        info = OrderedDict()
+        info["title"] = str(title)
+        info["version"] = str(version)
+        info["license"] = self.swag_license()
+
+        swagger = OrderedDict()
+        swagger["swagger"] = "2.0"
+        swagger["info"] = info
+        swagger["schemes"] = ["http"]
+        swagger["consumes"] = ["application/json"]
+        swagger["produces"] = ["application/json"]
+        return swagger
+
+    def swag_example(self, example):
         """
-        add the licence info
-        under tag "info"
+        the example (json text) as value
+        :param example: json text
+        :return: decoded json (order of the text is kept), the text itself if it is not valid json
         """
-        self.swag_write_stringln('"license": {')
-        self.swag_increase_indent()
-        self.swag_write_stringln('"name": "'+str(OCF_license_name)+'",')
-
-        text = self.swag_sanitize_description(OCF_license)
-        self.swag_write_stringln('"x-description": "'+str(text)+'"')
-
-        self.swag_decrease_indent()
-        self.swag_write_stringln('}')
+        try:
+            return json.loads(example, object_pairs_hook=OrderedDict)
+        except ValueError:
+            print "swag_example: not valid json, added as string:", example
+            return example
 
-    def swag_write_query_reference_parameter_block(self, method_obj, query=None, body=None):
+    def swag_schema_reference(self, schema_name):
         """
-        write the query reference as swagger parameter block as refeerence
-        query and body are needed to determine if an additional comma is needed.
-        :param method_obj: raml method_obj
-        :param query: raml query obj
-        :param body:  raml body obj
+        :param schema_name: name of the definition
+        :return: swagger reference object to the definition
         """
-        add_comma = False
-        if body is not None:
-            add_comma = True
-        if query is not None:
-            add_comma = True
-        if method_obj.is_ is not None:
-            num_items = len(method_obj.is_)
-            for ref_value in method_obj.is_:
-                text = '{"$ref": "#/parameters/'+str(ref_value)+'"}'
-                if num_items > 1:
-                    text +=","
-
-                elif num_items == 1:
-                    if add_comma is True:
-                        text +=","
-                self.swag_write_stringln(text)
-                num_items = num_items - 1
+        return OrderedDict([("$ref", "#/definitions/" + str(schema_name))])
 
+    def swag_query_reference_parameters(self, obj):
+        """
+        the query references (traits) as swagger parameter references
+        :param obj: raml resource or method object
+        :return: list of reference objects
+        """
+        parameters = []
+        if obj.is_ is not None:
+            for ref_value in obj.is_:
+                parameters.append(OrderedDict([("$ref", "#/parameters/" + str(ref_value))]))
+        return parameters
 
-    def swag_write_query_parameter_block(self, query_parameters, body=None):
+    def swag_query_parameters(self, query_parameters):
         """
-        write the query param block
-        body is needed to determine if an additional comma is needed.
+        the query parameters as swagger parameters
         :param query_parameters: raml query object
-        :param body: raml body object
+        :return: list of parameter objects
         """
+        parameters = []
         if query_parameters is not None:
             for query_name, query_object in query_parameters.items():
-                self.swag_write_stringln('{')
-                self.swag_increase_indent()
-                self.swag_write_stringln('"in": "query",')
-                query_description = self.swag_sanitize_description(query_object.description)
-                if query_description is not None:
-                    self.swag_write_stringln('"description": "'+str(query_description)+'",')
-                else:
-                    if query_object.displayName is not None:
-                        self.swag_write_stringln('"description": "'+str(query_object.displayName)+'",')
+                parameter = OrderedDict()
+                parameter["in"] = "query"
+                if query_object.description is not None:
+                    parameter["description"] = query_object.description
+                elif query_object.displayName is not None:
+                    parameter["description"] = query_object.displayName
                 if query_object.type is not None:
-                    self.swag_write_stringln('"type": "'+str(query_object.type)+'",')
+                    parameter["type"] = query_object.type
                 else:
                     # auto insert type
-                    self.swag_write_stringln('"type": "string",')
-                if query_object.required is not None:
-                    if query_object.required == True:
-                        self.swag_write_stringln('"required": true,')
+                    parameter["type"] = "string"
+                if query_object.required is True:
+                    parameter["required"] = True
                 if query_object.enum is not None:
-                    self.swag_write_stringln('"enum": '+ self.list_to_array(query_object.enum)+',')
-                # name as last, since it always needs to be there...
-                self.swag_write_stringln('"name": "'+str(query_name)+'"')
-                self.swag_decrease_indent()
-                if body is None:
-                    self.swag_write_stringln('}')
-                else:
-                    self.swag_write_stringln('},')
+                    parameter["enum"] = list(query_object.enum)
+                parameter["name"] = query_name
+                parameters.append(parameter)
+        return parameters
 
-    def swag_write_body_parameter_block(self, body):
+    def swag_body_parameter(self, body):
         """
-        write the body param block
+        the body as swagger parameter
         :param body: raml body object
+        :return: list with the body parameter object, empty when there is no body (schema)
         """
-        if body is not None:
-            if body.schema:
-                self.swag_write_stringln('{')
-                self.swag_increase_indent()
-                self.swag_write_stringln('"name": "body",')
-                self.swag_write_stringln('"in": "body",')
-                self.swag_write_stringln('"required": true,')
-                if body.example is None:
-                    self.swag_write_stringln('"schema": { "$ref": "#/definitions/'+str(body.schema)+'" }')
-                if body.example:
-                    self.swag_write_stringln('"schema": { "$ref": "#/definitions/'+str(body.schema)+'" },')
-                    self.swag_write_stringln('"x-example":')
-                    self.swag_increase_indent()
-                    adjusted_text = self.add_justification_smart(self.swag_indent, body.example, no_dot_split=True)
-                    self.swag_write_string_raw(adjusted_text)
-                    self.swag_decrease_indent()
-                self.swag_decrease_indent()
-                self.swag_write_stringln('}')
-
-    def swag_write_reponses(self, responses):
-        """
-        write the responses in an path
+        if body is None or not body.schema:
+            return []
+        parameter = OrderedDict()
+        parameter["name"] = "body"
+        parameter["in"] = "body"
+        parameter["required"] = True
+        parameter["schema"] = self.swag_schema_reference(body.schema)
+        if body.example:
+            parameter["x-example"] = self.swag_example(body.example)
+        return [parameter]
+
+    def swag_responses(self, responses):
+        """
+        the responses of an path
         :param responses: raml responses object
+        :return: swagger responses object
         """
-        nr_responses = len(responses.items())
+        swag_responses = OrderedDict()
+        if responses is None:
+            return swag_responses
         for response_name, response in responses.items():
-            #print response_name
-            self.swag_increase_indent()
-            self.swag_write_stringln('"'+str(response_name)+'": {')
-            self.swag_increase_indent()
+            swag_response = OrderedDict()
             response_description = response.description
-            if response is not None and response.body is not None:
-                for sName, body in response.body.items():
-                    if sName == "application/json":
-                        description = ""
-                        if response_description is not None:
-                            description = str(response_description)
-                        text = self.swag_sanitize_description(description)
-                        example = body.example
+            if response.body is not None:
+                for s_name, body in response.body.items():
+                    if s_name == "application/json":
                         # without the description field swagger won't validate
-                        self.swag_write_stringln('"description" : "'+text+'",')
-                        if example:
-                            self.swag_write_stringln('"x-example":')
-                            self.swag_increase_indent()
-                            if body.schema is not None:
-                                example += ","
-                            adjusted_text = self.add_justification_smart(self.swag_indent, example, no_dot_split=True)
-                            self.swag_write_string_raw(adjusted_text)
-                            self.swag_decrease_indent()
+                        swag_response["description"] = response_description or ""
+                        if body.example:
+                            swag_response["x-example"] = self.swag_example(body.example)
                         if body.schema:
-                            self.swag_write_stringln('"schema": { "$ref": "#/definitions/'+str(body.schema)+'" }')
-                    else:
-                        if response_description is not None:
-                            text = self.swag_sanitize_description(str(response_description))
-                            self.swag_write_stringln('"description" : "'+text)
-            else:
-                if response_description is not None:
-                    text = self.swag_sanitize_description(str(response_description))
-                    self.swag_write_stringln('"description" : "'+text+'"')
-
-            # close response
-            self.swag_decrease_indent()
-            if nr_responses > 1:
-                self.swag_write_stringln('},')
-            else:
-                self.swag_write_stringln('}')
-            nr_responses -= 1
-            self.swag_decrease_indent()
-
-    def swag_add_resource(self, parse_tree ):
+                            swag_response["schema"] = self.swag_schema_reference(body.schema)
+                    elif response_description is not None:
+                        swag_response["description"] = response_description
+            elif response_description is not None:
+                swag_response["description"] = response_description
+            swag_responses[str(response_name)] = swag_response
+        return swag_responses
+
+    def swag_add_resource(self, swagger, parse_tree):
         """
-        write all resources ( e.g. an swagger path object)
+        add all resources ( e.g. an swagger path object)
+        :param swagger: swagger object
         :param parse_tree: raml parse tree
         """
-        self.swag_write_stringln('"paths": {')
-        self.swag_increase_indent()
-        nr_resources = len(parse_tree.resources.items())
-        # write all the resources
+        paths = OrderedDict()
         for resource, obj in parse_tree.resources.items():
-            self.swag_write_stringln('"'+str(resource)+'" : {')
+            path = OrderedDict()
             if obj.methods is not None:
-                nr_methods = len(obj.methods.items())
-                self.swag_increase_indent()
                 resource_description = obj.description
                 print "swag_add_resource: resource_description", repr(resource_description)
                 print "swag_add_resource: object", obj
 
                 for method, method_obj in obj.methods.items():
-                    # write the method
-                    self.swag_write_stringln('"'+str(method)+'": {')
-                    self.swag_increase_indent()
+                    swag_method = OrderedDict()
                     # add the description
                     text = ""
                     if method == "get" and resource_description is not None:
-                        text = str(resource_description)
+                        text = resource_description
                     if method_obj.description is not None:
-                        text += str(method_obj.description)
-                    s_text = self.swag_sanitize_description(text)
-                    self.swag_write_stringln('"description": "'+str(s_text)+ '",')
-
-                    # write the parameters (query parametes and body)
-                    self.swag_write_stringln('"parameters": [')
-                    self.swag_increase_indent()
-                    # query parameters from the path variable..
-                    self.swag_write_query_reference_parameter_block(obj, query=method_obj.queryParameters, body=method_obj.body)
-                    if method_obj.is_ is not None:
-                        self.swag_write_stringln(',')
-                    self.swag_write_query_reference_parameter_block(method_obj, query=method_obj.queryParameters, body=method_obj.body)
-                    self.swag_write_query_parameter_block(method_obj.queryParameters, body=method_obj.body)
-                    self.swag_write_body_parameter_block(method_obj.body)
-                    # close parameters block
-                    self.swag_decrease_indent()
-                    self.swag_write_stringln('],')
-                    self.swag_decrease_indent()
-                    # write the responses block
-                    self.swag_increase_indent()
-                    self.swag_write_stringln('"responses": {')
-                    self.swag_increase_indent()
-                    self.swag_write_reponses(method_obj.responses)
-                    # close response block
-                    self.swag_decrease_indent()
-                    self.swag_write_stringln('}')
-                    self.swag_decrease_indent()
-                    # close method
-                    if nr_methods > 1:
-                        self.swag_write_stringln('},')
-                    else:
-                        self.swag_write_stringln('}')
-                    nr_methods -= 1
-                self.swag_decrease_indent()
-            # close paths
-            if nr_resources > 1:
-                self.swag_write_stringln('},')
-            else:
-                self.swag_write_stringln('}')
-            nr_resources -= 1
-        self.swag_decrease_indent()
-        self.swag_write_stringln('},')
-
-    def swag_add_generic_parameters(self, parse_tree ):
+                        text += method_obj.description
+                    swag_method["description"] = text
+                    # the parameters: references from the resource and method, query parameters and body
+                    swag_method["parameters"] = (self.swag_query_reference_parameters(obj) +
+                                                 self.swag_query_reference_parameters(method_obj) +
+                                                 self.swag_query_parameters(method_obj.queryParameters) +
+                                                 self.swag_body_parameter(method_obj.body))
+                    swag_method["responses"] = self.swag_responses(method_obj.responses)
+                    path[method] = swag_method
+            paths[resource] = path
+        swagger["paths"] = paths
+
+    def swag_add_generic_parameters(self, swagger, parse_tree):
         """
-        write the generic query params as referenced parameters block
+        add the generic query params as referenced parameters block
+        :param swagger: swagger object
         :param parse_tree: raml parse tree
         """
-        self.swag_write_stringln('"parameters": {')
-        self.swag_increase_indent()
-        processed_query_params = []
-        traits = parse_tree.traits
-        # write all the generic parameters
-        num_traits = len (traits.items())
-        for query_name, query_obj in traits.items():
-            self.swag_write_stringln('"'+query_name+'" : {')
-            self.swag_increase_indent()
-            self.swag_write_stringln('"in" : "query",')
-            query_param_len = len(query_obj.queryParameters)
+        parameters = OrderedDict()
+        for query_name, query_obj in parse_tree.traits.items():
+            parameter = OrderedDict()
+            parameter["in"] = "query"
             for name, q_obj in query_obj.queryParameters.items():
-                self.swag_write_stringln('"name" : "'+name+'",')
-                num_items = len (q_obj.items())
+                parameter["name"] = name
                 # add type = string if not available
-                is_type_available = False
-                for tag, tag_value in q_obj.items():
-                    if tag == "type":
-                        is_type_available
-                if is_type_available is False:
-                    self.swag_write_stringln('"type" : "string",')
+                parameter["type"] = "string"
                 for tag, tag_value in q_obj.items():
-                    print "tag:",tag
+                    print "tag:", tag
                     print "tag_value:", tag_value
-                    text = ""
-                    text = '"'+tag+'" : '
                     if tag == "enum":
-                        text += self.list_to_array(tag_value)
+                        parameter[tag] = list(tag_value)
                     else:
-                        text += '"'+self.list_to_string(q_obj)+'"'
-                    if num_items > 1:
-                        text += ","
-                    num_items -= 1
-                    self.swag_write_stringln(text)
-                if query_param_len > 1:
-                    self.swag_write_stringln(',')
-                query_param_len-=1
-            self.swag_decrease_indent()
-            if num_traits > 1:
-                self.swag_write_stringln('},')
-            else:
-                self.swag_write_stringln('}')
-            num_traits -= 1
+                        parameter[tag] = tag_value
+            parameters[query_name] = parameter
+        swagger["parameters"] = parameters
 
-        # close definitions
-        self.swag_decrease_indent()
-        self.swag_write_stringln('},')
-
-    def swag_add_references_as_include(self, full_source, dict_to_add_to ):
+    def swag_add_references_as_include(self, full_source, dict_to_add_to):
         """
-        write the generic query params as referenced parameters block
-        :param full_source: dict of an json schema object
-        :param dict_to_add_to: dict of the properties block of an json object to add the missing properties too
-        :return: adjusted dict
+        add the properties of the allOf schemas (e.g. oic.core) to the properties block of the definitions
+        the properties are taken from the merged view of the bundled allOf (see MergedProperties)
+        :param full_source: read-only bundled json schema object
+        :param dict_to_add_to: read-only definitions of the json schema object
+        :return: definitions, the definition with the properties block is an modifiable copy
         """
-        # find the first level of allOf... most of the time this is the definition part..
+        # copy in json text order, see thaw
+        definitions = {}
+        for name in getattr(dict_to_add_to, "key_order", None) or dict_to_add_to.keys():
+            definitions[name] = dict_to_add_to[name]
+        # find the first allOf... most of the time this is the definition part..
         allOf = find_key_link(full_source, 'allOf')
-        #get the pointer to the properties dict, there is where we have to add all the referenced properties
+        # the properties block where we have to add all the referenced properties
         to_property_list = find_key_link(dict_to_add_to, "properties")
-        # make sure we skip duplicate ones, other wise we will overwrite
-        tag_add = ["None"]
-        if to_property_list is not None:
-            for name, object in to_property_list.items():
-                tag_add.append(name)
-            # loop over the array of the allOf properties, only 1 level...
-            if allOf is not None:
-                for property_list in allOf:
-                    for name2, value in property_list.items():
-                        print ("swag_add_references_as_include", name2, value)
-                        if str(value)[0] != "#" and str(name2) == "$ref":
-                            # get the filename, it is the first part..
-                            filename = value.split('#', 1)[0]
-                            print ("swag_add_references_as_include: filename", filename)
-                            schema_string = self.read_file(filename)
-                            if schema_string is not None:
-                                json_dict = json.loads(schema_string)
-                                clean_dict(json_dict)
-                                properties = find_key_link(json_dict, 'properties')
-                                for name3, object in properties.items():
-                                    print ("  swag_add_references_as_include: property name found (from reference):", name3)
-                                    if name3 not in tag_add:
-                                        to_property_list[name3] = object
-                                        tag_add.append(name3)
-                                        print ("  swag_add_references_as_include: adding property name:", name3)
-                        else:
-                            # find the properties tag and add them..
-                            print ("swag_add_references_as_include: name-value:", name2, value)
-                            if str(name2) == "properties" :
-                            #properties = find_key_link(value, 'properties')
-                            #if properties is not None:
-                                for name3, object in value.items():
-                                        if name3 not in tag_add:
-                                            to_property_list[name3] = object
-                                            tag_add.append(name3)
-                                            print ("  swag_add_references_as_include: adding property name (direct list):", name3)
-
-        return dict_to_add_to
-
-    def swag_process_definition_from_body(self, processed_schemas, body):
+        if allOf is None or not isinstance(to_property_list, dict):
+            return definitions
+        properties = thaw(to_property_list)
+        merged = MergedProperties(FrozenDict([('allOf', allOf)]))
+        added = [name for name in merged.names if name != "None" and name not in properties]
+        print ("swag_add_references_as_include: adding property names:", added)
+        for name in added:
+            properties[name] = thaw(merged.schemas[name])
+        # copy only the definition that has the properties block
+        for name, definition in dict_to_add_to.items():
+            if definition is to_property_list:
+                definitions[name] = properties
+                break
+            if isinstance(definition, dict) and find_key_link(definition, "properties") is to_property_list:
+                definitions[name] = thaw(definition, {id(to_property_list): properties})
+                break
+        return definitions
+
+    def swag_process_definition_from_body(self, definitions, body):
         """
         processes the definitions referenced from an body.
-        :param processed_schemas: list of schemas that are already processed
+        :param definitions: swagger definitions object, the definition is added when not yet there
         :param body: body to process
         """
         schema_name = str(body.schema)
         print "swag_process_definition_from_body found schema definition:", schema_name
-        print "swag_process_definition_from_body processed schemas sofar:", processed_schemas
-        if schema_name not in processed_schemas:
-           if schema_name != "None":
-                print "swag_process_definition_from_body adding schema definition:", schema_name
-                if len(processed_schemas):
-                    # write an comma for the syntax, there is a predecessor..
-                    self.swag_write_stringln(',')
-                # add the schema to the list of written schema names.
-                processed_schemas.append(schema_name)
-                self.swag_write_stringln('"'+schema_name+'" : ')
-                self.swag_increase_indent()
-                print ("writing schema:", schema_name)
-
-                schema_string = self.get_schema_string_from_body(body)
-                if schema_string is not None:
-                    json_dict = json.loads(schema_string)
-                    if json_dict is not None:
-                        #clean_dict(json_dict)
-                        fix_references_dict(json_dict)
-                        required = find_key_link(json_dict, 'required')
-                        definitions = find_key_link(json_dict, 'definitions')
-                        if definitions is None:
-                            print ("swag_process_definition_from_body: no definitions found for schema:", schema_name)
-                        required_inobject = find_key_link(definitions, 'required')
-                        full_definitions = self.swag_add_references_as_include(json_dict, definitions)
-                        if full_definitions is not None:
-                            first = True
-                            for name, object in full_definitions.items():
-
-                                # looping over all schema names..
-                                print "swag_process_definition_from_body: name", name, object
-                                if required is not None and required_inobject is None:
-                                    # add the required string
-                                    print "swag_process_definition_from_body; adding required:", required
-                                    object["required"] = required
-                                    required_inobject = 1
-                                if name != "None":
-                                    object_string = json.dumps(object, sort_keys=True, indent=2, separators=(',', ': '))
-                                    print ("swag_process_definition_from_body: name :", name)
-                                    print ("swag_process_definition_from_body: adding :", object_string)
-                                    adjusted_text = self.add_justification_smart(self.swag_indent, object_string, no_dot_split=True)
-                                    if first  is True:
-                                        first = False
-                                        self.swag_write_stringln(adjusted_text)
-                                        #self.swag_write_stringln("----------")
-                self.swag_decrease_indent()
-
-    def swag_add_definitions(self, parse_tree ):
+        print "swag_process_definition_from_body processed schemas sofar:", definitions.keys()
+        if schema_name in definitions or schema_name == "None":
+            return
+        print "swag_process_definition_from_body adding schema definition:", schema_name
+        # empty schema when nothing usable is found, the references to the definition stay valid
+        definitions[schema_name] = OrderedDict()
+
+        schema_string = self.get_schema_string_from_body(body)
+        if schema_string is None:
+            return
+        try:
+            schema = self.registry.parse(schema_string)
+        except ValueError as e:
+            print "swag_process_definition_from_body: invalid json in schema:", schema_name, e
+            return
+        # the references are resolved by the dereferencer (see SchemaDereferencer),
+        # the keys are looked up in the index of the read-only bundled schema
+        file_key = content_hash(schema_string)
+        self.dereferencer.add_document(file_key, schema)
+        json_dict = self.dereferencer.bundle(schema, file_key)
+        required = find_key_link(json_dict, 'required')
+        schema_definitions = find_key_link(json_dict, 'definitions')
+        if schema_definitions is None:
+            print ("swag_process_definition_from_body: no definitions found for schema:", schema_name)
+            return
+        required_inobject = find_key_link(schema_definitions, 'required')
+        full_definitions = self.swag_add_references_as_include(json_dict, schema_definitions)
+        for name, object in full_definitions.items():
+            # looping over all schema names..
+            print "swag_process_definition_from_body: name", name, object
+            if required is not None and required_inobject is None:
+                # add the required string, to an modifiable copy of the definition
+                print "swag_process_definition_from_body; adding required:", required
+                if isinstance(object, FrozenDict):
+                    object = thaw(object)
+                object["required"] = required
+                required_inobject = 1
+            if name != "None":
+                print ("swag_process_definition_from_body: name :", name)
+                # only the first definition is used
+                definitions[schema_name] = sorted_dict(object)
+                break
+
+    def swag_add_definitions(self, swagger, parse_tree):
         """
         add the definition section (e.g. the swagger "schema definitions")
+        :param swagger: swagger object
         :param parse_tree: raml parse tree
         """
-        self.swag_write_stringln('"definitions": {')
-        self.swag_increase_indent()
-        processed_schemas = []
-        # write all the definitions
+        definitions = OrderedDict()
         for resource, obj in parse_tree.resources.items():
             print "swag_add_definitions resource:", resource
             if obj.methods is not None:
-                nr_methods = len(obj.methods.items())
-
                 for method, method_obj in obj.methods.items():
-                    print "swag_add_definitions resource:", resource
-                    # write schema block for the body
+                    # schema block for the body
                     if method_obj.body is not None:
                         if method_obj.body.schema:
                             print "swag_add_definitions: request"
-                            self.swag_process_definition_from_body (processed_schemas, method_obj.body )
+                            self.swag_process_definition_from_body(definitions, method_obj.body)
                     if method_obj.responses is not None:
                         for response_name, response in method_obj.responses.items():
                             if response is not None and response.body is not None:
                                 for sName, body in response.body.items():
                                     if sName == "application/json":
-
                                         print "swag_add_definitions: response"
-                                        self.swag_process_definition_from_body (processed_schemas, body )
-        # close definitions
-        self.swag_decrease_indent()
-        self.swag_write_stringln('}')
-
-    def swag_closefile(self):
-        """
-        close the file
-        e.g. end the json object with an closing }
-        """
-        self.swag_write_string_raw("}\n")
-        self.f.close();
+                                        self.swag_process_definition_from_body(definitions, body)
+        swagger["definitions"] = definitions
 
-    def swag_verify(self):
+    def swag_write(self, swagger):
         """
-        verify the generated swagger file.
-        easy verification: only check is that it is an valid json file
+        write the swagger object to the swagger file, see write_swagger
+        :param swagger: swagger object
         """
-        print "swag_verify"
-        input_string_schema = open(self.swagger, 'r').read()
-        json_dict =json.loads(input_string_schema)
+        write_swagger(swagger, self.swagger)
 
     def get_first_display_name(self, parse_tree):
         """
@@ -2380,29 +4052,80 @@ class CreateDoc(object):
         for resource, obj in parse_tree.resources.items():
             return obj.displayName
 
+    def swagger_document(self):
+        """
+        conversion of the raml info into an swagger object
+
+        :return: swagger object, None when the raml file could not be parsed
+        """
+        parse_tree = self.load_parse_tree()
+        if parse_tree is None:
+            return None
+
+        title = self.get_first_display_name(parse_tree)
+        version = parse_tree.version
+        swagger = self.swag_document(version, title)
+        self.swag_add_resource(swagger, parse_tree)
+        self.swag_add_generic_parameters(swagger, parse_tree)
+        self.swag_add_definitions(swagger, parse_tree)
+        dedupe_swagger(swagger)
+        return swagger
+
     def generate_swagger(self):
         """
         conversion of the raml info into swagger
 
         :return:
         """
-        try:
-            parse_tree = ramlparser.load(self.inputname)
-        except ValidationError as e:
-            print 'validation error:', e.errors
-            print "could not load file: error loading file"
-            traceback.print_exc()
+        swagger = self.swagger_document()
+        if swagger is None:
             return
-
-        title = self.get_first_display_name(parse_tree)
-        version = parse_tree.version
-        self.swag_openfile(version, title)
-        self.swag_add_resource(parse_tree)
-        self.swag_add_generic_parameters(parse_tree)
-        self.swag_add_definitions(parse_tree)
-        self.swag_closefile()
+        self.swag_write(swagger)
         print "swagger document saved..", self.swagger
-        self.swag_verify()
+
+    def generate_swagger_output(self):
+        """
+        swagger generation: the swagger file and the processed schemas
+        """
+        self.generate_swagger()
+        self.swag_process_schemas()
+
+    def generate(self):
+        """
+        generate all requested output from one parse of the raml file:
+        the word document and, when requested, the swagger output.
+        the swagger output is written in an worker process while the word document is generated,
+        the worker is forked after the parse and uses the parse tree of this process.
+        where processes can't be forked (windows) the outputs are generated one after the other.
+        """
+        global swagger_processor
+        if self.load_parse_tree() is None:
+            return
+
+        if self.swagger is None:
+            self.convert()
+            return
+        if not hasattr(os, "fork"):
+            self.convert()
+            self.generate_swagger_output()
+            return
+
+        # the worker gets the buffered output of this process as well, see swagger_output_task
+        sys.stdout.flush()
+        swagger_processor = self
+        pool = multiprocessing.Pool(1)
+        try:
+            pending = pool.apply_async(swagger_output_task)
+            pool.close()
+            self.convert()
+            done, output = pending.get()
+        finally:
+            swagger_processor = None
+            pool.join()
+        # the swagger output after the output of the word document, as in the serial run
+        sys.stdout.write(output)
+        if done is False:
+            sys.exit(1)
 
     def add_header(self, level_nr, header_title):
         """
@@ -2414,64 +4137,150 @@ class CreateDoc(object):
         :return:
         """
         try:
-            self.document = Document(docx=self.resourcedoc)
+            self.document = template_cache.document(self.resourcedoc)
         except:
             print "could not load file: ", self.resourcedoc
             print "make sure that docx file exist.."
             return
+        if self.load_styles() is False:
+            return
 
         header = str(header_title).replace("_", " ")
         print "add_header: title:", header
         paragraph = self.document.add_heading(header, level=1)
         if self.annex_switch is True:
             print "   as annex"
-            paragraph.style = 'ANNEX_title'
+            paragraph.style = self.styles['ANNEX_title']
 
         self.document.save(self.resource_out)
 
 
-    def swag_process_schemas(self):
+    def swag_schema_snippet(self, linestring):
+        """
+        the swagger snippet of an schema file: the (last) definition, with the required list and without type
+        :param linestring: schema text
+        :return: json text
+        """
+        # the keys are looked up in the index of the read-only schema,
+        # the definitions are copied: the required list is added and the type removed
+        json_dict = self.registry.parse(linestring)
+        #fix_references_dict(json_dict)
+        required = find_key_link(json_dict, 'required')
+        definitions = find_key_link(json_dict, 'definitions')
+        required_inobject = find_key_link(definitions, 'required')
+        #full_definitions = self.swag_add_references_as_include(json_dict, definitions)
+        print "required_inobject", required_inobject
+        #fix_references_dict(json_dict)
+        object_string = json.dumps(json_dict, sort_keys=True, indent=2, separators=(',', ': '))
+        if definitions is not None:
+            for name, object in definitions.items():
+                # looping over all schema names..
+                print "swag_add_definitions: name", name, object
+                object = thaw(object)
+                if required is not None and required_inobject is None:
+                    # add the required string
+                    print "adding required:", required
+                    object["required"] = required
+                    required_inobject = 1
+                #fix_references_dict(object)
+                print "swag_add_definitions (fixed): name", name, object
+                # the snippet should not have type.
+                try:
+                    del object["type"]
+                except:
+                    pass
+                object_string = json.dumps(object, sort_keys=True, indent=2, separators=(',', ': '))
+        return object_string
+
+    def swag_process_schema(self, schema_path, base, manifest):
+        """
+        write the swagger snippet of an schema file next to the swagger output,
+        unless the schema and the snippet did not change since the last run (see manifest)
+        :param schema_path: schema file
+        :param base: output directory
+        :param manifest: dict schema file name -> [input hash, output hash] of the last run
+        :return: tuple (schema file name, "written", "skipped" or "failed", [input hash, output hash])
+        """
+        schema_file = os.path.basename(schema_path)
+        full_path = os.path.join(base, schema_file)
+        print schema_file
+        try:
+            # the files referenced from the raml are already read by the docx/swagger generation
+            linestring = self.read_file(schema_path)
+            input_hash = content_hash("%d:%s" % (SCHEMA_SNIPPET_FORMAT, linestring))
+            entry = manifest.get(schema_file)
+            if entry is not None and entry[0] == input_hash and os.path.isfile(full_path):
+                with open(full_path, 'r') as f:
+                    if content_hash(f.read()) == entry[1]:
+                        return schema_file, "skipped", entry
+
+            object_string = self.swag_schema_snippet(linestring)
+            write_file_atomic(full_path, object_string)
+            print full_path
+            return schema_file, "written", [input_hash, content_hash(object_string)]
+        except Exception:
+            print "swag_process_schema: failed:", schema_path
+            traceback.print_exc()
+            return schema_file, "failed", None
+
+    def swag_process_schemas(self, jobs=None):
+        """
+        write the swagger snippets of all schemas in the schema dir next to the swagger output.
+        only schemas that changed (or whose snippet changed on disk) are written,
+        the hashes of the last run are kept in an manifest file in the output directory.
+        :param jobs: number of threads, None: number of cpus
+        """
         if args['schemadir'] is None:
             return
         if args['swagger'] is None:
             return
-        schema_list = get_dir_list(args['schemadir'],".json")
-        for schema_file in schema_list:
-            print schema_file
-            json_dict = load_json_schema(schema_file, args['schemadir'])
-            #fix_references_dict(json_dict)
-            required = find_key_link(json_dict, 'required')
-            definitions = find_key_link(json_dict, 'definitions')
-            required_inobject = find_key_link(definitions, 'required')
-            #full_definitions = self.swag_add_references_as_include(json_dict, definitions)
-            print "required_inobject", required_inobject
-            #fix_references_dict(json_dict)
-            object_string = json.dumps(json_dict, sort_keys=True, indent=2, separators=(',', ': '))
-            if definitions is not None:
-                for name, object in definitions.items():
-                    # looping over all schema names..
-                    print "swag_add_definitions: name", name, object
-                    if required is not None and required_inobject is None:
-                        # add the required string
-                        print "adding required:", required
-                        object["required"] = required
-                        required_inobject = 1
-                    #fix_references_dict(object)
-                    print "swag_add_definitions (fixed): name", name, object
-                    # the snippet should not have type.
-                    try:
-                        del object["type"]
-                    except:
-                        pass
-                    object_string = json.dumps(object, sort_keys=True, indent=2, separators=(',', ': '))
-
-            base = os.path.dirname(swagger)
-            full_path = os.path.join(base,schema_file)
+        if self.schema_directory is None:
+            self.schema_directory = SchemaDirectory([args['schemadir']])
+        schema_list = self.schema_directory.files(".json", schema_dir=args['schemadir'])
+        base = os.path.dirname(self.swagger)
+        manifest_path = os.path.join(base, SCHEMA_MANIFEST)
+        manifest = {}
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (IOError, ValueError):
+            pass
 
-            print full_path
-            fwrite = open(full_path, 'w')
-            fwrite.write(object_string)
-            fwrite.close()
+        if jobs is None:
+            jobs = multiprocessing.cpu_count()
+        jobs = max(1, min(jobs, len(schema_list)))
+        tasks = [(schema_path, base, manifest) for schema_path in schema_list]
+        # the output of each file is collected and printed in the order of the files
+        output = ThreadOutput(sys.stdout)
+        stdout = sys.stdout
+        stderr = sys.stderr
+        sys.stdout = output
+        sys.stderr = output
+        try:
+            if jobs > 1:
+                pool = ThreadPool(jobs)
+                try:
+                    results = pool.map(lambda task: output.collect(self.swag_process_schema, *task), tasks)
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                results = [output.collect(self.swag_process_schema, *task) for task in tasks]
+        finally:
+            sys.stdout = stdout
+            sys.stderr = stderr
+
+        counts = {"written": 0, "skipped": 0, "failed": 0}
+        new_manifest = {}
+        for (schema_file, status, entry), text in results:
+            sys.stdout.write(text)
+            counts[status] += 1
+            if entry is not None:
+                new_manifest[schema_file] = entry
+        if new_manifest != manifest:
+            write_file_atomic(manifest_path, json.dumps(new_manifest, sort_keys=True, indent=2, separators=(',', ': ')))
+        print "swag_process_schemas: written:", counts["written"], " skipped:", counts["skipped"], \
+            " failed:", counts["failed"]
 
 #
 # code for the proxy
@@ -2548,6 +4357,8 @@ def proxy():
 
 
 if __name__ == '__main__':
+    # needed for the validation pool in the frozen (py2exe) executable
+    multiprocessing.freeze_support()
 
     resourcedoc = "ResourceTemplate.docx"
     # set the execution path of the tool
@@ -2574,6 +4385,10 @@ if __name__ == '__main__':
     parser.add_argument('-outdocx', '--outdocx', help='word output file')
     parser.add_argument('-raml', '--raml', help='raml input file')
     parser.add_argument('-schemadir', '--schemadir', help='schema dir input file')
+    parser.add_argument('-schemapath', '--schemapath', nargs='*',
+         help='additional schema dirs, searched after the schema dir (--schemapath "dir1" "dir2" )')
+    parser.add_argument('-schemarecursive', '--schemarecursive',
+         help='also search the sub directories of the schema dirs (--schemarecursive true)')
     parser.add_argument('-heading1', '--heading1', help='creates an heading 1 to the document (and exit)')
     # parser.add_option('-showResources','--showResources', help='shows the resources in an RAML file')
     parser.add_argument('-resource', '--resource', help='resource to be processed')
@@ -2591,6 +4406,24 @@ if __name__ == '__main__':
          help='additional (referenced) schema used in the resource (--schema "schema file1" "schema file2" )')
     parser.add_argument('-schemaWT', '--schemaWT', nargs='*',
          help='additional (referenced) schema (section With Table) used in the resource (--schema "schema file1" "schema file2" )')
+    parser.add_argument('-parsecache', '--parsecache', '--parse-cache',
+         help='directory to cache parsed RAML files between runs (--parsecache <dir>)')
+    parser.add_argument('-parsecachesize', '--parsecachesize', '--parse-cache-size', type=int, default=64,
+         help='maximum size of the parse cache directory in MB (--parsecachesize 64)')
+    parser.add_argument('-maxerrors', '--maxerrors', '--max-errors', type=int,
+         help='stop validating an example after the first N errors (--maxerrors 10)')
+    parser.add_argument('-validatejobs', '--validatejobs', '--validate-jobs', type=int, default=1,
+         help='number of processes validating the examples (--validatejobs 4)')
+    parser.add_argument('-swaggermerge', '--swaggermerge', '--swagger-merge', nargs='+',
+         help='one swagger file (--swagger <outputfile>) for all raml files (--swaggermerge <dir or raml files>)')
+    parser.add_argument('-swaggerjobs', '--swaggerjobs', '--swagger-jobs', type=int,
+         help='number of processes parsing the raml files for --swaggermerge (default: number of cpus)')
+    parser.add_argument('-proxy', '--proxy',
+         help='fetch referenced schemas that are not in the schema dir via the http proxy (--proxy true)')
+    parser.add_argument('-templatecache', '--templatecache',
+         help='parse the word template once and copy it for each document (--templatecache true)')
+    parser.add_argument('-stats', '--stats',
+         help='print the extra options and the cache statistics (--stats true)')
 
     args = vars(parser.parse_args())
 
@@ -2608,6 +4441,11 @@ if __name__ == '__main__':
     swagger = args['swagger']
     fixed_uri = args['fixed']
     rt_provided_name = args['rtname']
+    parse_cache_dir = args['parsecache']
+    proxy_switch = args['proxy']
+    schema_recursive_switch = args['schemarecursive']
+    template_cache_switch = args['templatecache']
+    stats_switch = args['stats']
 
     if annex_switch is None:
         annex_switch = False
@@ -2643,6 +4481,26 @@ if __name__ == '__main__':
     else:
         schemaWT_switch = True
 
+    if proxy_switch is None:
+        proxy_switch = False
+    else:
+        proxy_switch = True
+
+    if schema_recursive_switch is None:
+        schema_recursive_switch = False
+    else:
+        schema_recursive_switch = True
+
+    if template_cache_switch is None:
+        template_cache_switch = False
+    else:
+        template_cache_switch = True
+
+    if stats_switch is None:
+        stats_switch = False
+    else:
+        stats_switch = True
+
     if docxName is None:
         docxName = resourcedoc
 
@@ -2667,6 +4525,17 @@ if __name__ == '__main__':
         print "schema file                  :", schema_file
     if schemaWT_switch == True:
         print "schema (WT) file             :", schemaWT_file
+    if stats_switch == True:
+        print "schema path                  :", args['schemapath']
+        print "recursive schema dirs        :", schema_recursive_switch
+        print "parse cache                  :", parse_cache_dir
+        print "max validation errors        :", args['maxerrors']
+        print "validation jobs              :", args['validatejobs']
+        print "proxy                        :", proxy_switch
+        print "swagger merge                :", args['swaggermerge']
+        print "swagger merge jobs           :", args['swaggerjobs']
+        print "yaml backend                 :", getattr(ramlparser, "YAML_BACKEND", "python")
+        print "cache word templates         :", template_cache_switch
 
     print "styles:"
     print " heading: Heading 1 or ANNEX-heading1"
@@ -2686,12 +4555,30 @@ if __name__ == '__main__':
     # sys.stdout = sys.stderr
     sys.stderr = sys.stdout
 
-    # start the proxy
-    proxy()
+    # start the proxy, only used for references that are not in the schema dir
+    if proxy_switch is True:
+        proxy()
+
+    template_cache.enabled = template_cache_switch
 
     if my_dir:
         os.chdir(my_dir)
 
+    if args['swaggermerge'] is not None:
+        if swagger is None:
+            print "--swaggermerge needs the output file: --swagger <outputfile>"
+            sys.exit(1)
+        schema_dirs = None
+        if args['schemadir'] is not None:
+            schema_dirs = [args['schemadir']] + (args['schemapath'] or [])
+        problems = generate_merged_swagger(args['swaggermerge'], swagger, schema_dirs=schema_dirs,
+                                           recursive=schema_recursive_switch, jobs=args['swaggerjobs'],
+                                           parse_cache_dir=parse_cache_dir)
+        if problems is None or problems > 0:
+            # files that could not be processed, conflicts or nothing written
+            sys.exit(1)
+        sys.exit()
+
     if len(sys.argv) == 1:
         parser.print_help()
         processor = None
@@ -2711,6 +4598,13 @@ if __name__ == '__main__':
         processor.swagger = swagger
         processor.fixed_uri = fixed_uri
         processor.dir = args['schemadir']
+        processor.max_errors = args['maxerrors']
+        processor.validate_jobs = args['validatejobs']
+        processor.schema_directory = SchemaDirectory([args['schemadir']] + (args['schemapath'] or []),
+                                                     recursive=schema_recursive_switch)
+        validator_cache.configure(processor.schema_directory, proxy_switch)
+        if parse_cache_dir is not None and ParseCache is not None:
+            processor.parse_cache = ParseCache(parse_cache_dir, max_size=args['parsecachesize'] * 1024 * 1024)
         if args['outdocx'] is not None:
             processor.resource_out = args['outdocx']
         if schema_switch is True:
@@ -2722,11 +4616,24 @@ if __name__ == '__main__':
             sys.exit()
 
     if processor is not None:
-        processor.convert()
-
-    if swagger is not None:
-        processor.generate_swagger()
-        processor.swag_process_schemas()
+        processor.generate()
 
     for resource, obj in processor.parsetree.resources.items():
         print "resource :", resource
+
+    if stats_switch is True:
+        include_cache = getattr(ramlparser, "include_cache", None)
+        if include_cache is not None:
+            print "include cache                :", include_cache.stats()
+        if processor.parse_cache is not None:
+            print "parse cache                  :", processor.parse_cache.stats()
+        print "schema table                 :", len(processor.schema_table)
+        print "schema registry              :", schema_registry.stats()
+        print "validator cache              :", validator_cache.stats()
+        print "dereferencer                 :", processor.dereferencer.stats()
+        print "merged property views        :", processor.flattener.stats()
+        print "template cache               :", template_cache.stats()
+        if validator_cache.schema_store is not None:
+            print "schema store                 :", validator_cache.schema_store.stats()
+        if processor.schema_directory is not None:
+            print "schema directory             :", processor.schema_directory.stats()
@@ -0,0 +1,120 @@
+#############################
+#
+#    copyright 2016 Open Interconnect Consortium, Inc. All rights reserved.
+#    Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+#    1.  Redistributions of source code must retain the above copyright notice, this list of conditions and the following disclaimer.
+#    2.  Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+#    THIS SOFTWARE IS PROVIDED BY THE OPEN INTERCONNECT CONSORTIUM, INC. "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+#    INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE OR WARRANTIES OF NON-INFRINGEMENT,
+#    ARE DISCLAIMED. IN NO EVENT SHALL THE OPEN INTERCONNECT CONSORTIUM, INC. OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+#    OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#    OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+#    OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+#############################
+"""
+text layout of the generated RAML code sections and swagger output.
+
+the functions work on (generators of) lines, so that the output can be written line by line.
+the string functions join the lines once at the end.
+
+>>> justify("  ", "a\\nb")
+'  a\\n  b\\n'
+>>> justify_smart("  ", "First. Second\\n")
+'  First\\n  Second\\n'
+>>> remove_eol("a\\nb")
+'a b '
+>>> list_to_array(["a", "b"])
+'["a", "b"]'
+"""
+
+
+def sentences(lines):
+    """
+    split the lines at ". ", empty sentences are dropped
+    :param lines: iterable of lines
+    :return: generator of sentences
+    """
+    for line in lines:
+        for sentence in line.split(". "):
+            if len(sentence) > 0:
+                yield sentence
+
+
+def indent_lines(depth, lines):
+    """
+    add the indentation and end of line to each line
+    :param depth: indentation (string)
+    :param lines: iterable of lines
+    :return: generator of indented lines, with end of line
+    """
+    for line in lines:
+        yield depth + line + "\n"
+
+
+def justify_lines(depth, input_string, split_sentences=False):
+    """
+    indented lines of the input string, see justify and justify_smart
+    :param depth: indentation (string)
+    :param input_string: string to be adjusted
+    :param split_sentences: put every sentence on an separate line
+    :return: generator of indented lines, with end of line
+    """
+    lines = input_string.splitlines()
+    if split_sentences is True:
+        lines = sentences(lines)
+    return indent_lines(depth, lines)
+
+
+def justify(depth, input_string):
+    """
+    add the spaces for an correct indentation of the generated RAML code section
+    needed for schema and code
+    :param depth: indentation (string)
+    :param input_string: string to be adjusted
+    :return: adjusted string
+    """
+    return "".join(justify_lines(depth, input_string))
+
+
+def justify_smart(depth, input_string, no_dot_split=False):
+    """
+    add the spaces for an correct indentation of the generated RAML code section
+    for descriptions in the RAML definitions, every sentence on an separate line
+    :param depth: indentation (string)
+    :param input_string: string to be adjusted
+    :param no_dot_split: do not split the sentences (same as justify)
+    :return: adjusted string
+    """
+    return "".join(justify_lines(depth, input_string, split_sentences=not no_dot_split))
+
+
+def remove_eol(input_string):
+    """
+    removes all EOL of the input string, each line is followed by an space
+    :param input_string: string
+    :return: string without EOL chars
+    """
+    return "".join(line + " " for line in input_string.splitlines())
+
+
+def list_to_string(input_list):
+    """
+    concatenation of the items in the list
+    :param input_list: python list ["aa", "bb"] (or string)
+    :return: string, example "aabb"
+    """
+    return "".join(input_list)
+
+
+def list_to_array(input_list):
+    """
+    generates an raml string representation of an python list
+    :param input_list: python list
+    :return: string as raml string representation. example = '["blah", "blah2"]'
+    """
+    if len(input_list) == 0:
+        # as before: "[" minus the (absent) last comma
+        return "]"
+    return "[" + ", ".join('"' + x + '"' for x in input_list) + "]"
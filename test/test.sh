@@ -22,11 +22,16 @@ function compare_to_reference_file {
 
 
 function compare_to_reference_file_in_dir {
-    diff -w $OUTPUT_DIR/$1 $REF_DIR/$2/$1
+    diff -w $OUTPUT_DIR/$2/$1 $REF_DIR/$2/$1
     echo "output $1 difference: $TEST_CASE $?"
     #echo "blah"
 }
 
+function compare_runs {
+    diff -w $OUTPUT_DIR/$1 $OUTPUT_DIR/$2
+    echo "output $2 difference: $TEST_CASE $?"
+}
+
 function compare_file {
     echo "comparing ($TEST_CASE): " $1 $2
     diff -wb $1 $2
@@ -166,7 +171,44 @@ compare_to_reference_file_in_dir $TEST_CASE.swagger.json $TEST_CASE
 
 }
 
+function tests_parse_cache {
+
+# option -parsecache: a cold cache and the warm cache give the same output
+TEST_CASE="test_parse_cache"
+rm -rf $OUTPUT_DIR/parse_cache
+my_test -docx ../input/ResourceTemplate.docx -schemadir ../test/in/test_1/ -resource BinarySwitchResURI -raml ../test/in/test_1/binarySwitch.raml -outdocx $OUTPUT_DIR_DOCS/$TEST_CASE.docx --parsecache $OUTPUT_DIR_DOCS/parse_cache --parsecachesize 1
+$PYTHON_EXE $RAML2DOC -docx ../input/ResourceTemplate.docx -schemadir ../test/in/test_1/ -resource BinarySwitchResURI -raml ../test/in/test_1/binarySwitch.raml -outdocx $OUTPUT_DIR_DOCS/$TEST_CASE.docx --parsecache $OUTPUT_DIR_DOCS/parse_cache --parsecachesize 1 > $OUTPUT_DIR/${TEST_CASE}_warm$EXT 2>&1
+compare_runs $TEST_CASE$EXT ${TEST_CASE}_warm$EXT
+
+}
+
+function tests_validate_jobs {
+
+# option -validatejobs: the examples validated in 4 processes give the same output as serially
+TEST_CASE="test_validate_jobs"
+my_test -docx ../input/ResourceTemplate.docx -schemadir ../test/in/test_3_error -resource BinarySwitchResURI -raml ../test/in/test_3_error/binarySwitch.raml -outdocx $OUTPUT_DIR_DOCS/$TEST_CASE.docx --validatejobs 4
+$PYTHON_EXE $RAML2DOC -docx ../input/ResourceTemplate.docx -schemadir ../test/in/test_3_error -resource BinarySwitchResURI -raml ../test/in/test_3_error/binarySwitch.raml -outdocx $OUTPUT_DIR_DOCS/$TEST_CASE.docx > $OUTPUT_DIR/${TEST_CASE}_serial$EXT 2>&1
+compare_runs $TEST_CASE$EXT ${TEST_CASE}_serial$EXT
+
+}
+
+function tests_swagger_merge {
+
+# option -swaggermerge: one swagger file for the raml files of test_swagger_1 and test_swagger_2
+TEST_CASE="test_swagger_merge"
+mkdir -p $OUTPUT_DIR_DOCS/$TEST_CASE
+my_test_in_dir -swaggermerge ../test/in/test_1/binarySwitch.raml ../test/in/test_2_schema_dir/binarySwitch.raml -swagger $OUTPUT_DIR_DOCS/$TEST_CASE/$TEST_CASE.swagger.json --swaggerjobs 2
+compare_to_reference_file_in_dir $TEST_CASE.swagger.json $TEST_CASE
+$PYTHON_EXE $RAML2DOC -swaggermerge ../test/in/test_1/binarySwitch.raml ../test/in/test_2_schema_dir/binarySwitch.raml -swagger $OUTPUT_DIR_DOCS/$TEST_CASE/$TEST_CASE.swagger.json --swaggerjobs 1 > $OUTPUT_DIR/$TEST_CASE/${TEST_CASE}_serial$EXT 2>&1
+compare_runs $TEST_CASE/$TEST_CASE$EXT $TEST_CASE/${TEST_CASE}_serial$EXT
+compare_to_reference_file_in_dir $TEST_CASE.swagger.json $TEST_CASE
+
+}
+
 tests  
 tests_derived
 tests_swagger
 test_resolve_reference
+tests_parse_cache
+tests_validate_jobs
+tests_swagger_merge